@@ -1,11 +1,33 @@
+import os
+from typing import NamedTuple
+
 from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database import get_db
-from models import Member
+import crud
+import env  # noqa: F401 — loads .env before the settings below are read
+from cache import LRUCache
+from database import get_session, run
+from timing import span
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+
+class MemberRecord(NamedTuple):
+    """The parts of a Member that request handlers need, safe to share across sessions."""
+    id: int
+    household_id: int
+    name: str
 
 
-def get_current_member(request: Request, db: Session = Depends(get_db)) -> Member | None:
+token_cache = LRUCache(TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
+async def get_current_member(
+    request: Request, db: Session | AsyncSession = Depends(get_session)
+) -> MemberRecord | None:
     """Extract Bearer token from Authorization header and look up the member.
     Returns None if invalid — callers return a 200 error response for Siri compatibility."""
     auth = request.headers.get("Authorization", "")
@@ -14,4 +36,26 @@ def get_current_member(request: Request, db: Session = Depends(get_db)) -> Membe
     token = auth.removeprefix("Bearer ").strip()
     if not token:
         return None
-    return db.query(Member).filter(Member.token == token).first()
+
+    with span("auth"):
+        member = token_cache.get(token)
+        if member is None:
+            row = await run(db, crud.get_member_by_token, token)
+            if row is None:
+                return None
+            member = MemberRecord(*row)
+            token_cache.set(token, member)
+    return member
+
+
+def invalidate_token(token: str) -> None:
+    token_cache.pop(token)
+
+
+def invalidate_member(member_id: int) -> None:
+    """Forget a member's cached token, e.g. after removing them from a household."""
+    token_cache.pop_where(lambda member: member.id == member_id)
+
+
+def invalidate_household(household_id: int) -> None:
+    token_cache.pop_where(lambda member: member.household_id == household_id)
@@ -0,0 +1,62 @@
+"""Compare the per-category keyword loop against the compiled categorize().
+
+Usage: python benchmarks/bench_categories.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from categories import CATEGORY_KEYWORDS, categorize, categorize_many
+
+WORDS = [
+    "cordless", "drill", "blue", "mug", "winter", "jacket", "usb", "cable",
+    "spare", "batteries", "old", "widget", "garden", "hose", "lego", "set",
+    "christmas", "ornaments", "thermometer", "random", "thing", "box",
+]
+
+
+def make_names(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def loop_categorize(item_name: str) -> str:
+    lower = item_name.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in lower:
+                return category
+    return "Other"
+
+
+def timeit(fn, names: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(names)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'names':>8}  {'loop ms':>9}  {'matcher ms':>10}  {'batch ms':>9}  {'speedup':>7}")
+    for n in args.sizes:
+        names = make_names(n)
+        assert [categorize(name) for name in names] == [loop_categorize(name) for name in names]
+        loop = timeit(lambda batch: [loop_categorize(name) for name in batch], names, args.repeat)
+        matcher = timeit(lambda batch: [categorize(name) for name in batch], names, args.repeat)
+        batch = timeit(categorize_many, names, args.repeat)
+        print(f"{n:>8}  {loop * 1e3:>9.2f}  {matcher * 1e3:>10.2f}  {batch * 1e3:>9.2f}  {loop / matcher:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Stress join-code allocation: create many households against a fresh SQLite file.
+
+Every household goes through crud.create_household, so a taken code is
+skipped by ON CONFLICT DO NOTHING and drawn again. Reports throughput,
+how many codes had to be redrawn and how long joining by code takes once
+the table is full. --code-length shrinks the codes to force collisions
+(3 characters leave 31^3 = 29,791 codes).
+
+Usage: python benchmarks/bench_join_codes.py [--households 1000000] [--code-length 6] [--joins 10000]
+"""
+import argparse
+import os
+import random
+import secrets
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import crud
+from database import Base
+from models import JOIN_CODE_ALPHABET, Household
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--households", type=int, default=1_000_000)
+    parser.add_argument("--code-length", type=int, default=6)
+    parser.add_argument("--joins", type=int, default=10_000)
+    args = parser.parse_args()
+
+    drawn = 0
+
+    def join_code() -> str:
+        nonlocal drawn
+        drawn += 1
+        return "".join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(args.code_length))
+
+    crud._join_code = join_code
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(connection, _):
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        failed = 0
+        start = last = time.perf_counter()
+        with Session() as db:
+            for n in range(1, args.households + 1):
+                try:
+                    crud.create_household(db, f"Home {n}", "Alice")
+                except RuntimeError:
+                    failed += 1
+                if n % 100_000 == 0:
+                    now = time.perf_counter()
+                    print(f"{n:>9,} households  {100_000 / (now - last):8,.0f}/s  redrawn {drawn - n:,}")
+                    last = now
+        elapsed = time.perf_counter() - start
+        created = args.households - failed
+        print(
+            f"created {created:,} in {elapsed:.1f}s ({created / elapsed:,.0f}/s), "
+            f"redrawn {drawn - args.households:,}, gave up {failed:,}"
+        )
+
+        with Session() as db:
+            codes = db.scalars(select(Household.join_code)).all()
+            assert len(codes) == len(set(codes)) == created
+            sample = random.sample(codes, min(args.joins, len(codes)))
+            start = time.perf_counter()
+            for code in sample:
+                assert crud.join_household(db, code, "Bob") is not None
+            elapsed = time.perf_counter() - start
+        print(f"joined {len(sample):,} households in {elapsed:.2f}s ({elapsed / len(sample) * 1e6:.0f} µs each)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare the original parse() against the precompiled, gated one.
+
+Usage: python benchmarks/bench_nlp.py [--repeat 5]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import nlp
+from nlp import LEADING_ARTICLES
+
+UTTERANCES = [
+    "the drill is in the garage toolbox",
+    "um I think the towels are in the linen closet.",
+    "I'm putting the superglue in the laundry room cabinet",
+    "we left the stroller in the mudroom",
+    "band-aids, bathroom cabinet",
+    "scissors on desk",
+    "the freezer contains ice cream",
+    "so like the spare key is under the doormat you know",
+    "hello world",
+    "the garage has my power tools!",
+]
+WORST_CASE = {
+    "in + newline": "x in " * 2000 + "x\nz",
+    "comma + newline": "x , " * 2500 + "x\nz",
+    "has + newline": "x has " * 1700 + "x\nz",
+}
+ORIGINAL_FILLERS = re.compile(
+    r"\b(um|uh|like|so|well|okay|oh|actually|basically|i think|you know)\b", re.IGNORECASE
+)
+ORIGINAL_PATTERNS = [(pattern, groups) for pattern, groups, _ in nlp.PATTERNS]
+
+
+def original_parse(raw_input: str) -> tuple[str, str] | None:
+    text = raw_input.strip()
+    text = re.sub(r"[.!?]+$", "", text)
+    text = ORIGINAL_FILLERS.sub("", text)
+    cleaned = re.sub(r"\s{2,}", " ", text).strip()
+    if not cleaned:
+        return None
+    for pattern, (item_group, loc_group) in ORIGINAL_PATTERNS:
+        m = pattern.match(cleaned)
+        if m:
+            item = LEADING_ARTICLES.sub("", m.group(item_group).strip()).strip()
+            location = LEADING_ARTICLES.sub("", m.group(loc_group).strip()).strip()
+            if item and location:
+                return item, location
+    return None
+
+
+def timeit(fn, inputs: list[str], repeat: int, loops: int = 1) -> float:
+    """Best per-call time over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for text in inputs:
+                fn(text)
+        best = min(best, (time.perf_counter() - start) / (loops * len(inputs)))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'input':>16}  {'original':>10}  {'new':>10}  {'speedup':>7}")
+    rows = [("utterances (µs)", UTTERANCES, 1e6, 2000)]
+    rows += [(f"{name} (ms)", [text], 1e3, 1) for name, text in WORST_CASE.items()]
+    for label, inputs, scale, loops in rows:
+        for text in inputs:
+            assert nlp.parse(text) == original_parse(text)
+        old = timeit(original_parse, inputs, args.repeat, loops)
+        new = timeit(nlp.parse, inputs, args.repeat, loops)
+        print(f"{label:>16}  {old * scale:>10.2f}  {new * scale:>10.2f}  {old / new:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
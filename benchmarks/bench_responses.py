@@ -0,0 +1,102 @@
+"""Compare Pydantic response models against the orjson fast path for big lists.
+
+The old path builds an ItemResponse / SearchResultItem per row and lets
+FastAPI validate and encode it against the endpoint's response_model union;
+the fast path serializes dicts zipped from the column tuples with orjson.
+Both go through a real FastAPI app, so routing and middleware cost is included.
+
+Usage: python benchmarks/bench_responses.py [--sizes 100 1000 10000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from responses import JSONResponse, item_dicts, search_result_dicts
+from schemas import ErrorResponse, ItemListResponse, ItemResponse, SearchResponse, SearchResultItem
+from search_index import IndexedItem
+
+
+def make_rows(n: int) -> list[tuple]:
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, f"thing {i}", "garage shelf", "Tools", "Alice", start + timedelta(seconds=i))
+        for i in range(n)
+    ]
+
+
+def make_app(rows: list[tuple]) -> FastAPI:
+    matches = [(IndexedItem(*row[:4]), 90) for row in rows]
+    app = FastAPI()
+
+    @app.get("/old/items", response_model=ItemListResponse | ErrorResponse)
+    async def old_items():
+        return ItemListResponse(
+            count=len(rows),
+            items=[
+                ItemResponse(id=r[0], name=r[1], location=r[2], category=r[3], added_by=r[4], created_at=r[5])
+                for r in rows
+            ],
+        )
+
+    @app.get("/new/items", response_model=ItemListResponse | ErrorResponse)
+    async def new_items():
+        return JSONResponse({"count": len(rows), "items": item_dicts(rows), "next_cursor": None})
+
+    @app.get("/old/search", response_model=SearchResponse | ErrorResponse)
+    async def old_search():
+        return SearchResponse(
+            query="thing",
+            results=[
+                SearchResultItem(id=item.id, name=item.name, location=item.location, category=item.category, score=score)
+                for item, score in matches
+            ],
+        )
+
+    @app.get("/new/search", response_model=SearchResponse | ErrorResponse)
+    async def new_search():
+        return JSONResponse({"query": "thing", "message": "", "results": search_result_dicts(matches)})
+
+    return app
+
+
+async def timeit(client: httpx.AsyncClient, path: str, repeat: int) -> tuple[float, bytes]:
+    best, body = float("inf"), b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path)
+        best = min(best, time.perf_counter() - start)
+        body = response.content
+    return best, body
+
+
+async def run(sizes: list[int], repeat: int) -> None:
+    print(f"{'rows':>8}  {'endpoint':>8}  {'pydantic ms':>11}  {'orjson ms':>9}  {'speedup':>7}")
+    for n in sizes:
+        transport = httpx.ASGITransport(app=make_app(make_rows(n)))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint in ("items", "search"):
+                old, old_body = await timeit(client, f"/old/{endpoint}", repeat)
+                new, new_body = await timeit(client, f"/new/{endpoint}", repeat)
+                # Same JSON either way; a mismatch means the fast path drifted from the schema
+                assert old_body == new_body, endpoint
+                print(f"{n:>8}  {endpoint:>8}  {old * 1e3:>11.2f}  {new * 1e3:>9.2f}  {old / new:>6.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the per-item search loop, token_set_ratio over the raw fields
+(how search scored before the normalized columns), and HouseholdIndex over
+precomputed normalized fields, for the full ranking and the top 3 Siri
+reads out.
+
+Usage: python benchmarks/bench_search.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from search import THRESHOLD, WEIGHTS, fuzzy_search, normalize
+from search_index import HouseholdIndex
+
+NOUNS = [
+    "drill", "hammer", "wrench", "charger", "cable", "plates", "mug", "towels",
+    "blanket", "batteries", "tape", "scissors", "stapler", "hose", "tent",
+    "helmet", "jacket", "boots", "lego", "puzzle", "thermometer", "sponge",
+]
+ADJECTIVES = ["", "power", "spare", "old", "blue", "small", "winter", "usb", "cordless"]
+PLACES = [
+    "garage", "kitchen drawer", "hall closet", "attic", "basement shelf",
+    "bathroom cabinet", "shed", "office desk", "mudroom", "linen closet",
+]
+CATEGORIES = ["Tools", "Kitchen", "Electronics", "Outdoor", "Clothing", "Other"]
+QUERIES = ["drill", "kitchen drawer", "spare batteries", "tools", "winter jacket"]
+
+
+def make_items(n: int, seed: int = 0) -> list[SimpleNamespace]:
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}".strip(),
+            location=rng.choice(PLACES),
+            category=rng.choice(CATEGORIES),
+        )
+        for i in range(n)
+    ]
+
+
+def loop_search(items, query):
+    query = normalize(query)
+    results = []
+    for item in items:
+        best = int(max(
+            round(fuzz.token_set_ratio(query, normalize(value)) * weight, 6)
+            for value, weight in zip((item.name, item.location, item.category), WEIGHTS)
+        ))
+        if best >= THRESHOLD:
+            results.append((item, best))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results
+
+
+def raw_search(columns, query):
+    """token_set_ratio over every raw field, weighted, as a cdist call per field."""
+    best = None
+    for column, weight in zip(columns, WEIGHTS):
+        scores = process.cdist([query], column, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=1)[0] * weight
+        best = scores if best is None else np.maximum(best, scores)
+    rows = np.flatnonzero(best >= THRESHOLD)
+    return rows[np.argsort(-best[rows], kind="stable")]
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in QUERIES:
+            fn(query)
+        best = min(best, (time.perf_counter() - start) / len(QUERIES))
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>8}  {'loop ms':>9}  {'raw ms':>9}  {'index ms':>9}  {'saving':>7}  {'top-3 ms':>9}")
+    for n in args.sizes:
+        items = make_items(n)
+        columns = ([i.name for i in items], [i.location for i in items], [i.category for i in items])
+        index = HouseholdIndex((i, item.name, item.location, item.category) for i, item in enumerate(items))
+        for query in QUERIES:
+            expected = loop_search(items, query)
+            assert fuzzy_search(items, query) == expected
+            found = [(items[entry.id], score) for entry, score in index.search(query)]
+            assert found == expected
+            assert index.search(query, limit=3) == index.search(query)[:3]
+        loop = timeit(lambda q: loop_search(items, q), args.repeat)
+        raw = timeit(lambda q: raw_search(columns, q), args.repeat)
+        indexed = timeit(lambda q: index.search(q), args.repeat)
+        top = timeit(lambda q: index.search(q, limit=3), args.repeat)
+        print(
+            f"{n:>8}  {loop * 1e3:>9.2f}  {raw * 1e3:>9.2f}  {indexed * 1e3:>9.2f}"
+            f"  {raw / indexed:>6.1f}x  {top * 1e3:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure cold-start cost: importing the app, and spawning it until it answers.
+
+Each run is a fresh interpreter against a fresh SQLite file. "import" is
+`python -c "import main"`; "first response" is from spawning uvicorn to the
+first 200 from /health, and "first search" adds creating a household and
+searching it, which is the first request needing the database and rapidfuzz.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--migrations startup|background|off]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - start
+
+
+def time_first_requests(env: dict, port: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:create_app", "--factory", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError("The server exited before answering")
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.002)
+            first_response = time.perf_counter() - start
+            token = client.post("/households", json={"household_name": "Bench", "your_name": "A"}).json()["token"]
+            client.get("/items/search", params={"q": "drill"}, headers={"Authorization": f"Bearer {token}"})
+            first_search = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return first_response, first_search
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--migrations", default="startup", choices=["startup", "background", "off"])
+    parser.add_argument("--port", type=int, default=18100)
+    args = parser.parse_args()
+
+    timings: dict[str, list[float]] = {"import": [], "first response": [], "first search": []}
+    for run in range(args.runs):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'startup.db')}",
+                "MIGRATIONS": args.migrations,
+            }
+            timings["import"].append(time_import(env))
+            first_response, first_search = time_first_requests(env, args.port)
+            timings["first response"].append(first_response)
+            timings["first search"].append(first_search)
+
+    print(f"{'':>15}  {'median ms':>9}  {'min ms':>7}")
+    for name, values in timings.items():
+        print(f"{name:>15}  {statistics.median(values) * 1e3:>9.0f}  {min(values) * 1e3:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
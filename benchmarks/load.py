@@ -0,0 +1,272 @@
+"""Load-test the Siri-facing endpoints against a local uvicorn.
+
+Seeds N households x M items straight through the models, starts the API,
+then drives POST /items, POST /search, GET /items/search, GET /items and
+DELETE /items/{id} from concurrent clients. Latency percentiles and RPS per
+endpoint are printed as JSON.
+
+Usage:
+    python benchmarks/load.py [--households 20] [--items 500] [--concurrency 16]
+                              [--duration 20] [--workers 1] [--output run.json]
+                              [--baseline previous.json] [--tolerance 0.15]
+    python benchmarks/load.py --compare previous.json run.json
+
+With --baseline (or --compare) endpoints whose p50/p95/p99 grew, or whose RPS
+fell, by more than the tolerance are reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+NOUNS = [
+    "drill", "hammer", "wrench", "charger", "cable", "plates", "mug", "towels",
+    "blanket", "batteries", "tape", "scissors", "stapler", "hose", "tent",
+    "helmet", "jacket", "boots", "lego", "puzzle", "thermometer", "sponge",
+]
+ADJECTIVES = ["", "power", "spare", "old", "blue", "small", "winter", "usb", "cordless"]
+PLACES = [
+    "garage", "kitchen drawer", "hall closet", "attic", "basement shelf",
+    "bathroom cabinet", "shed", "office desk", "mudroom", "linen closet",
+]
+QUERIES = ["drill", "kitchen drawer", "spare batteries", "tools", "winter jacket", "where is the tape"]
+
+# Relative frequency of each operation; reads dominate, as they do from Siri
+MIX = {
+    "POST /items": 2,
+    "POST /search": 4,
+    "GET /items/search": 4,
+    "GET /items": 2,
+    "DELETE /items/{id}": 1,
+}
+PERCENTILES = (50, 95, 99)
+
+
+def _thing(rng: random.Random) -> str:
+    return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}".strip()
+
+
+def seed(database_url: str, households: int, items: int, seed: int = 0) -> list[str]:
+    """Create the households and items; returns one member token per household."""
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import insert
+
+    from categories import categorize
+    from database import SessionLocal, engine
+    from migrations import upgrade
+    from models import Household, Item, Member
+    from search_index import stored_fields
+
+    upgrade(engine)
+    rng = random.Random(seed)
+    tokens = []
+    with SessionLocal() as db:
+        for h in range(households):
+            household = Household(name=f"Household {h}")
+            member = Member(household=household, name="Bench")
+            db.add_all([household, member])
+            db.flush()
+            rows = []
+            for _ in range(items):
+                name, location = _thing(rng), rng.choice(PLACES)
+                category = categorize(name)
+                # As crud.add_items writes them, so searches load what production loads
+                rows.append({
+                    "household_id": household.id,
+                    "added_by": member.id,
+                    "name": name,
+                    "location": location,
+                    "category": category,
+                    "raw_input": f"{name} in {location}",
+                    **stored_fields(name, location, category),
+                })
+            if rows:
+                db.execute(insert(Item), rows)
+            tokens.append(member.token)
+        db.commit()
+    engine.dispose()
+    return tokens
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float) -> dict:
+    endpoints = {}
+    for name in MIX:
+        values = sorted(latencies.get(name, []))
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+            **{f"p{p}_ms": round(percentile(values, p) * 1000, 3) for p in PERCENTILES},
+        }
+    everything = sorted(v for values in latencies.values() for v in values)
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "rps": round(len(everything) / elapsed, 2),
+        **{f"p{p}_ms": round(percentile(everything, p) * 1000, 3) for p in PERCENTILES},
+        "endpoints": endpoints,
+    }
+
+
+async def drive(base_url: str, tokens: list[str], concurrency: int, duration: float, seed: int = 0) -> dict:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    # Items added during the run, per token, for DELETE to remove
+    added: dict[str, deque[int]] = defaultdict(deque)
+    names, weights = list(MIX), list(MIX.values())
+
+    async def request(client: httpx.AsyncClient, rng: random.Random) -> None:
+        token = rng.choice(tokens)
+        headers = {"Authorization": f"Bearer {token}"}
+        name = rng.choices(names, weights)[0]
+        if name == "DELETE /items/{id}" and not added[token]:
+            name = "POST /items"
+
+        start = time.perf_counter()
+        if name == "POST /items":
+            thing = _thing(rng)
+            response = await client.post("/items", json={"raw_input": f"the {thing} is in the {rng.choice(PLACES)}"}, headers=headers)
+        elif name == "POST /search":
+            response = await client.post("/search", json={"query": rng.choice(QUERIES)}, headers=headers)
+        elif name == "GET /items/search":
+            response = await client.get("/items/search", params={"q": rng.choice(QUERIES)}, headers=headers)
+        elif name == "GET /items":
+            response = await client.get("/items", params={"limit": 50}, headers=headers)
+        else:
+            response = await client.delete(f"/items/{added[token].popleft()}", headers=headers)
+        latencies[name].append(time.perf_counter() - start)
+
+        # Siri-facing errors come back as 200 with an "error" field
+        body = response.json() if response.status_code == 200 else {}
+        if response.status_code != 200 or "error" in body:
+            errors[name] += 1
+        elif name == "POST /items":
+            added[token].append(body["item"]["id"])
+
+    async def worker(number: int, deadline: float) -> None:
+        rng = random.Random(seed * 1000 + number)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                await request(client, rng)
+
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(n, deadline) for n in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def start_server(database_url: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "PORT": str(port), "WEB_CONCURRENCY": str(workers)}
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited: {server.stderr.read().decode()[-2000:]}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server didn't come up within 60s")
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of current against baseline, worst first."""
+    regressions = []
+    for name, before in baseline.get("endpoints", {}).items():
+        after = current.get("endpoints", {}).get(name)
+        if not after or not before.get("requests") or not after.get("requests"):
+            continue
+        for metric in [f"p{p}_ms" for p in PERCENTILES]:
+            if before[metric] > 0 and after[metric] > before[metric] * (1 + tolerance):
+                change = after[metric] / before[metric] - 1
+                regressions.append((change, f"{name} {metric}: {before[metric]} -> {after[metric]} (+{change:.0%})"))
+        if before["rps"] > 0 and after["rps"] < before["rps"] * (1 - tolerance):
+            change = 1 - after["rps"] / before["rps"]
+            regressions.append((change, f"{name} rps: {before['rps']} -> {after['rps']} (-{change:.0%})"))
+    return [message for _, message in sorted(regressions, reverse=True)]
+
+
+def _report_regressions(baseline_path: str, current: dict, tolerance: float) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(baseline, current, tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions beyond {tolerance:.0%} against {baseline_path}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--households", type=int, default=20)
+    parser.add_argument("--items", type=int, default=500, help="items per household")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="report to compare this run against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown, as a fraction")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[1]) as f:
+            return _report_regressions(args.compare[0], json.load(f), args.tolerance)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database_url = args.database_url or f"sqlite:///{os.path.join(scratch, 'load.db')}"
+        tokens = seed(database_url, args.households, args.items, args.seed)
+        server = start_server(database_url, args.port, args.workers)
+        try:
+            report = asyncio.run(drive(f"http://127.0.0.1:{args.port}", tokens, args.concurrency, args.duration, args.seed))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report["config"] = {
+        key: getattr(args, key)
+        for key in ("households", "items", "concurrency", "duration", "workers", "seed")
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if args.baseline:
+        return _report_regressions(args.baseline, report, args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""Bulk item ingestion and household export/import.
+
+Uploads are read into numbered lines, parsed and categorized as a batch
+through the interpret memo, then inserted BATCH_SIZE rows per
+INSERT ... RETURNING statement. POST /items/bulk reads the whole upload
+first; POST /households/import reads it as it arrives, so its size isn't
+capped. GET /households/export streams the household back out from a
+server-side cursor in the same NDJSON or CSV shape import reads.
+"""
+import codecs
+import csv
+import io
+import json
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import crud
+import invalidation
+from auth import MemberRecord
+from categories import categorize_many
+from database import open_session, run, stream_rows
+from interpret import interpret_many
+from schemas import BulkLineResult, ItemResponse
+from search_cache import search_cache
+from search_index import household_index
+from timing import span
+
+BATCH_SIZE = 500
+MAX_LINES = 10_000
+# Rows fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 1000
+# A single line longer than this is almost certainly not an inventory
+MAX_LINE_LENGTH = 64 * 1024
+# Failed lines listed in an import's response; the rest are only counted
+IMPORT_ERRORS_SHOWN = 100
+
+EXPORT_FIELDS = ("name", "location", "category", "raw_input", "added_by", "created_at")
+NOT_UNDERSTOOD = "I couldn't understand that. Try something like: 'the drill is in the garage' or 'drill, garage'."
+CSV_COLUMNS = "The CSV needs a raw_input column, or name and location columns."
+
+
+class BulkLine(NamedTuple):
+    line: int
+    raw_input: str
+    # Set when the upload names the item and location itself (CSV name/location columns)
+    parsed: tuple[str, str] | None = None
+    # Kept from an export instead of being worked out again
+    category: str | None = None
+    created_at: datetime | None = None
+
+
+class MalformedLine(ValueError):
+    """One line of an upload can't be used; the lines around it may be fine."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+
+
+def _created_at(number: int, value: str) -> datetime | None:
+    if not value:
+        return None
+    try:
+        created_at = datetime.fromisoformat(value)
+    except ValueError as exc:
+        raise MalformedLine(number, f"Line {number} has an invalid created_at.") from exc
+    # Exports from SQLite carry naive UTC timestamps
+    return created_at if created_at.tzinfo else created_at.replace(tzinfo=timezone.utc)
+
+
+def _from_record(number: int, record: dict) -> BulkLine | None:
+    """A CSV row or NDJSON object; explicit name and location win over raw_input."""
+    fields = {}
+    for key in ("raw_input", "name", "location", "category", "created_at"):
+        value = record.get(key)
+        if value is not None and not isinstance(value, str):
+            raise MalformedLine(number, f"Line {number}: {key} must be a string.")
+        fields[key] = (value or "").strip()
+
+    name, location = fields["name"], fields["location"]
+    extras = (fields["category"] or None, _created_at(number, fields["created_at"]))
+    if name and location:
+        return BulkLine(number, fields["raw_input"] or f"{name}, {location}", (name, location), *extras)
+    if fields["raw_input"]:
+        return BulkLine(number, fields["raw_input"], None, *extras)
+    if name or location:
+        return BulkLine(number, f"{name}, {location}", None, *extras)
+    return None
+
+
+def _ends_quoted(text: str, quoted: bool) -> bool:
+    """Whether a CSV quoted field is still open at the end of this line.
+
+    Like csv.reader, a quote only opens a field at its start, so the inch
+    mark in `6" nails` is just a character; inside a field "" is a quote.
+    """
+    field_start = not quoted
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quoted:
+            if char == '"':
+                if text[i + 1:i + 2] == '"':
+                    i += 1
+                else:
+                    quoted = False
+        elif char == '"' and field_start:
+            quoted = True
+        field_start = not quoted and char == ","
+        i += 1
+    return quoted
+
+
+class UploadReader:
+    """Turns an NDJSON, CSV or plain-text upload into BulkLines one line at a time.
+
+    feed() raises MalformedLine for a line that can't be used and ValueError
+    for a CSV header without the columns it needs.
+    """
+
+    def __init__(self, content_type: str):
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type in ("application/x-ndjson", "application/jsonl"):
+            self.format = "ndjson"
+        elif media_type == "text/csv":
+            self.format = "csv"
+        else:
+            self.format = "text"
+        self._columns: list[str] | None = None
+        # A CSV record whose quoted field runs over several lines
+        self._record: list[str] = []
+        self._record_start = 0
+        self._record_length = 0
+        self._quoted = False
+
+    def feed(self, number: int, text: str) -> BulkLine | None:
+        if self.format == "ndjson":
+            return self._ndjson(number, text)
+        if self.format == "csv":
+            return self._csv(number, text)
+        text = text.strip()
+        return BulkLine(number, text) if text else None
+
+    def finish(self) -> None:
+        if self._record:
+            self._unclosed()
+        if self.format == "csv" and self._columns is None:
+            raise ValueError(CSV_COLUMNS)
+
+    def _ndjson(self, number: int, text: str) -> BulkLine | None:
+        if not text.strip():
+            return None
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise MalformedLine(number, f"Line {number} isn't valid JSON.") from exc
+        if isinstance(value, str):
+            return BulkLine(number, value)
+        line = _from_record(number, value) if isinstance(value, dict) else None
+        if line is None:
+            raise MalformedLine(number, f"Line {number} needs a raw_input string.")
+        return line
+
+    def _unclosed(self) -> None:
+        start = self._record_start
+        self._record, self._record_length, self._quoted = [], 0, False
+        raise MalformedLine(start, f"Line {start} has an unclosed quote.")
+
+    def _csv(self, number: int, text: str) -> BulkLine | None:
+        if not self._record:
+            self._record_start = number
+        self._record.append(text)
+        self._record_length += len(text)
+        self._quoted = _ends_quoted(text, self._quoted)
+        if self._quoted:
+            # A record can't outgrow a line, so memory stays bounded
+            if self._record_length > MAX_LINE_LENGTH:
+                self._unclosed()
+            return None
+        record, self._record, self._record_length = "\n".join(self._record), [], 0
+        if not record.strip():
+            return None
+
+        values = next(csv.reader([record]))
+        if self._columns is None:
+            if "raw_input" not in values and not {"name", "location"} <= set(values):
+                raise ValueError(CSV_COLUMNS)
+            self._columns = values
+            return None
+        return _from_record(self._record_start, dict(zip(self._columns, values)))
+
+
+def read_upload(content_type: str, body: bytes) -> list[BulkLine]:
+    """Split an NDJSON, CSV or plain-text upload into lines; raises ValueError if malformed."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise ValueError("Uploads must be UTF-8 text.") from exc
+
+    reader = UploadReader(content_type)
+    lines = []
+    for number, raw in enumerate(text.splitlines(), start=1):
+        line = reader.feed(number, raw)
+        if line is not None:
+            lines.append(line)
+    reader.finish()
+    if len(lines) > MAX_LINES:
+        raise ValueError(f"Send at most {MAX_LINES} lines at a time.")
+    return lines
+
+
+async def _text_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Numbered lines of UTF-8 text as the chunks holding them arrive."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def decode(chunk: bytes, final: bool = False) -> str:
+        try:
+            return decoder.decode(chunk, final)
+        except UnicodeDecodeError as exc:
+            raise ValueError("Uploads must be UTF-8 text.") from exc
+
+    number, pending = 0, ""
+    async for chunk in chunks:
+        *complete, pending = (pending + decode(chunk)).split("\n")
+        for text in complete:
+            number += 1
+            yield number, text.rstrip("\r")
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ValueError(f"Line {number + 1} is too long.")
+    pending += decode(b"", final=True)
+    if pending:
+        yield number + 1, pending.rstrip("\r")
+
+
+def from_utterances(utterances: Iterable[str]) -> list[BulkLine]:
+    lines = [BulkLine(number, raw) for number, raw in enumerate(utterances, start=1)]
+    if len(lines) > MAX_LINES:
+        raise ValueError(f"Send at most {MAX_LINES} lines at a time.")
+    return lines
+
+
+async def ingest(
+    db: Session | AsyncSession, member: MemberRecord, lines: list[BulkLine]
+) -> AsyncIterator[list[BulkLineResult]]:
+    """Parse, categorize and insert lines, yielding each batch's results once committed."""
+    for start in range(0, len(lines), BATCH_SIZE):
+        batch = lines[start:start + BATCH_SIZE]
+        with span("parse"):
+            interpreted = iter(interpret_many(line.raw_input for line in batch if line.parsed is None))
+            # CSV name/location rows skip parsing but may still need a category
+            given_categories = iter(categorize_many(
+                line.parsed[0] for line in batch if line.parsed is not None and line.category is None
+            ))
+
+        results: list[BulkLineResult] = []
+        accepted: list[tuple[BulkLine, str, str, str]] = []
+        for line in batch:
+            if line.parsed is not None:
+                accepted.append((line, *line.parsed, line.category or next(given_categories)))
+            elif (fields := next(interpreted)) is not None:
+                name, location, category = fields
+                accepted.append((line, name, location, line.category or category))
+            else:
+                results.append(BulkLineResult(line=line.line, raw_input=line.raw_input, error=NOT_UNDERSTOOD))
+
+        # One statement inserts the batch, so every row needs the same columns
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "name": name,
+                "location": location,
+                "category": category,
+                "raw_input": line.raw_input,
+                "created_at": line.created_at or now,
+            }
+            for line, name, location, category in accepted
+        ]
+        inserted = await run(db, crud.add_items, member.household_id, member.id, rows)
+
+        for (line, *_), row, (item_id, created_at) in zip(accepted, rows, inserted):
+            household_index.add_item(member.household_id, item_id, row["name"], row["location"], row["category"])
+            results.append(BulkLineResult(
+                line=line.line,
+                raw_input=line.raw_input,
+                item=ItemResponse(
+                    id=item_id,
+                    name=row["name"],
+                    location=row["location"],
+                    category=row["category"],
+                    added_by=member.name,
+                    created_at=created_at,
+                ),
+            ))
+        if inserted:
+            await search_cache.invalidate(member.household_id)
+            await invalidation.publish(invalidation.ITEMS, member.household_id)
+
+        results.sort(key=lambda result: result.line)
+        yield results
+
+
+async def import_upload(
+    db: Session | AsyncSession, member: MemberRecord, content_type: str, chunks: AsyncIterable[bytes]
+) -> AsyncIterator[list[BulkLineResult]]:
+    """Ingest an upload of any length as it arrives, one transaction per BATCH_SIZE lines.
+
+    Lines that can't be read come back as errors alongside the rest. A bad
+    CSV header or bytes that aren't UTF-8 raise ValueError; batches already
+    yielded stay committed.
+    """
+    reader = UploadReader(content_type)
+    batch: list[BulkLine] = []
+    rejected: list[BulkLineResult] = []
+    async for number, text in _text_lines(chunks):
+        try:
+            line = reader.feed(number, text)
+        except MalformedLine as exc:
+            rejected.append(BulkLineResult(line=exc.line, raw_input=text, error=str(exc)))
+            continue
+        if line is not None:
+            batch.append(line)
+        if len(batch) == BATCH_SIZE:
+            yield await _ingest_batch(db, member, batch, rejected)
+            batch, rejected = [], []
+    try:
+        reader.finish()
+    except MalformedLine as exc:
+        rejected.append(BulkLineResult(line=exc.line, raw_input="", error=str(exc)))
+    if batch or rejected:
+        yield await _ingest_batch(db, member, batch, rejected)
+
+
+async def _ingest_batch(
+    db: Session | AsyncSession, member: MemberRecord, batch: list[BulkLine], rejected: list[BulkLineResult]
+) -> list[BulkLineResult]:
+    results = [result async for results in ingest(db, member, batch) for result in results]
+    return sorted([*rejected, *results], key=lambda result: result.line)
+
+
+def _export_csv(rows, header: bool) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(
+        (row.name, row.location, row.category, row.raw_input, row.added_by, row.created_at.isoformat())
+        for row in rows
+    )
+    return out.getvalue()
+
+
+def _export_ndjson(rows) -> str:
+    return "".join(
+        json.dumps({**row._asdict(), "created_at": row.created_at.isoformat()}) + "\n"
+        for row in rows
+    )
+
+
+async def export(household_id: int, format: str) -> AsyncIterator[str]:
+    """The household's items, oldest first, as NDJSON or CSV that import_upload reads back."""
+    header = format == "csv"
+    async with open_session() as db:
+        async for rows in stream_rows(db, crud.export_items(household_id), EXPORT_BATCH_SIZE):
+            yield _export_csv(rows, header) if format == "csv" else _export_ndjson(rows)
+            header = False
+    if header:
+        # Nothing to export: still a valid, importable CSV
+        yield _export_csv([], header)
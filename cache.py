@@ -0,0 +1,142 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional expiry.
+
+    With `sliding=True` an entry's expiry is pushed back on every hit, so
+    `ttl` acts as an idle timeout rather than a fixed lifetime.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None, sliding: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sliding = sliding
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expiry(self, now: float) -> float:
+        return now + self.ttl if self.ttl is not None else float("inf")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if self.sliding:
+                self._data[key] = (value, self._expiry(now))
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry without touching recency, expiry or counters."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[1] <= time.monotonic():
+                return default
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, self._expiry(now))
+            self._data.move_to_end(key)
+            self._evict(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def pop_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches predicate; returns how many went."""
+        with self._lock:
+            doomed = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in doomed:
+                del self._data[key]
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self, now: float) -> None:
+        # Oldest entries sit at the front, so expired ones are dropped from there first
+        while self._data:
+            key, (_, expires_at) = next(iter(self._data.items()))
+            if len(self._data) <= self.maxsize and expires_at > now:
+                break
+            del self._data[key]
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.peek(key, _MISSING) is not _MISSING
+
+
+class Versions:
+    """Version numbers for keys whose cached data goes stale on writes, in a bounded LRU.
+
+    Every number comes from one counter shared by all keys, including the
+    one a key is given when first asked about. A key that was evicted or
+    cleared therefore never gets an old number back, so anything filed
+    under a number read before that stays unreachable.
+    """
+
+    def __init__(self, maxsize: int):
+        self._versions = LRUCache(maxsize)
+        self._next = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> int:
+        with self._lock:
+            version = self._versions.get(key)
+            if version is None:
+                version = next(self._next)
+                self._versions.set(key, version)
+            return version
+
+    def bump(self, key: Hashable) -> int:
+        with self._lock:
+            version = next(self._next)
+            self._versions.set(key, version)
+            return version
+
+    def clear(self) -> None:
+        """Move every key on at once."""
+        self._versions.clear()
+
+    def __len__(self) -> int:
+        return len(self._versions)
@@ -1,3 +1,6 @@
+from collections import deque
+from collections.abc import Iterable
+
 CATEGORY_KEYWORDS: dict[str, list[str]] = {
     "Tools": [
         "drill", "hammer", "screw", "nail", "wrench", "plier", "saw",
@@ -48,11 +51,90 @@ CATEGORY_KEYWORDS: dict[str, list[str]] = {
 }
 
 
+_NO_MATCH = 1 << 30
+
+
+class _Matcher:
+    """Aho–Corasick automaton over every keyword, built once per table.
+
+    Each state records the best (lowest) category rank of any keyword
+    ending there, so one pass over the name finds the earliest category
+    with a keyword anywhere in it — the same answer as checking each
+    category's keywords in turn.
+    """
+
+    def __init__(self, table: dict[str, list[str]]):
+        self.categories = list(table)
+        goto: list[dict[str, int]] = [{}]
+        rank = [_NO_MATCH]
+        for index, category in enumerate(self.categories):
+            for keyword in table[category]:
+                state = 0
+                for char in keyword:
+                    if char not in goto[state]:
+                        goto.append({})
+                        rank.append(_NO_MATCH)
+                        goto[state][char] = len(goto) - 1
+                    state = goto[state][char]
+                rank[state] = min(rank[state], index)
+
+        # Breadth-first over the trie: fill in failure links and turn goto
+        # into a full transition table so matching never backtracks
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            rank[state] = min(rank[state], rank[fail[state]])
+            for char, target in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[target] = goto[fallback].get(char, 0)
+                queue.append(target)
+            for char, target in delta[fail[state]].items():
+                delta[state].setdefault(char, target)
+
+        self.delta = delta
+        self.rank = rank
+
+    def best_rank(self, text: str) -> int:
+        delta, rank = self.delta, self.rank
+        state, best = 0, rank[0]
+        for char in text:
+            state = delta[state].get(char, 0)
+            if rank[state] < best:
+                best = rank[state]
+                if best == 0:
+                    break
+        return best
+
+
+_matcher = _Matcher(CATEGORY_KEYWORDS)
+# Bumped by reload() so memoized categories (interpret.py) know to start over
+version = 0
+
+
+def reload() -> None:
+    """Rebuild the matcher after CATEGORY_KEYWORDS changes."""
+    global _matcher, version
+    _matcher = _Matcher(CATEGORY_KEYWORDS)
+    version += 1
+
+
 def categorize(item_name: str) -> str:
     """Return a category for the item based on keyword substring matching."""
-    lower = item_name.lower()
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in lower:
-                return category
-    return "Other"
+    best = _matcher.best_rank(item_name.lower())
+    return _matcher.categories[best] if best != _NO_MATCH else "Other"
+
+
+def categorize_many(item_names: Iterable[str]) -> list[str]:
+    """categorize() over a batch, scoring each distinct name once."""
+    seen: dict[str, str] = {}
+    results = []
+    for name in item_names:
+        category = seen.get(name)
+        if category is None:
+            category = seen[name] = categorize(name)
+        results.append(category)
+    return results
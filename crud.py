@@ -0,0 +1,268 @@
+"""Database work for the request handlers in main.py.
+
+Each function takes a sync Session as its first argument so handlers can
+run it through database.run() in either sync or async mode.
+"""
+import base64
+import binascii
+from collections import defaultdict
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import Insert, Row, Select, delete, func, insert, literal, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import phonetic
+import search_backend
+from models import Household, Item, Member, _join_code, _utcnow, _uuid
+from search_index import stored_fields
+
+
+# Each attempt collides with probability households / 887M, so running out means something else is wrong
+JOIN_CODE_ATTEMPTS = 8
+
+
+class Membership(NamedTuple):
+    """What HouseholdResponse reports after creating or joining a household."""
+
+    household_name: str
+    join_code: str
+    your_name: str
+    token: str
+
+
+def _dml_ctes(db: Session) -> bool:
+    # PostgreSQL runs INSERTs inside WITH, so a write and the lookup it depends
+    # on go out as one statement; elsewhere they take one statement each
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _insert_household(db: Session, **values) -> Insert:
+    """INSERT that skips, rather than fails on, a join code already in use."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(Household).values(**values).on_conflict_do_nothing(index_elements=[Household.join_code])
+
+
+def create_household(db: Session, household_name: str, member_name: str) -> Membership:
+    """Insert the household and its first member, with defaults generated here rather than read back.
+
+    A join code that's already taken inserts nothing, and another one is
+    drawn within the same transaction, so the usual case reads nothing first.
+    """
+    now, token = _utcnow(), _uuid()
+    member = {"name": member_name, "token": token, "created_at": now}
+    for _ in range(JOIN_CODE_ATTEMPTS):
+        join_code = _join_code()
+        household = _insert_household(db, name=household_name, join_code=join_code, created_at=now)
+        if _dml_ctes(db):
+            new = household.returning(Household.id).cte("new_household")
+            created = db.execute(insert(Member).from_select(
+                ["household_id", *member],
+                select(new.c.id, *(literal(value, Member.__table__.c[key].type) for key, value in member.items())),
+            ).returning(Member.id)).first()
+        else:
+            created = db.execute(household.returning(Household.id)).scalar()
+            if created is not None:
+                db.execute(insert(Member).values(household_id=created, **member))
+        if created is not None:
+            db.commit()
+            return Membership(household_name, join_code, member_name, token)
+    db.rollback()
+    raise RuntimeError(f"No free join code after {JOIN_CODE_ATTEMPTS} attempts")
+
+
+def join_household(db: Session, join_code: str, member_name: str) -> Membership | None:
+    """Add a member to the household with join_code; None if there isn't one."""
+    now, token = _utcnow(), _uuid()
+    if _dml_ctes(db):
+        household = (
+            select(Household.id, Household.name).where(Household.join_code == join_code).cte("household")
+        )
+        joined = (
+            insert(Member)
+            .from_select(
+                ["household_id", "name", "token", "created_at"],
+                select(
+                    household.c.id,
+                    literal(member_name, Member.name.type),
+                    literal(token, Member.token.type),
+                    literal(now, Member.created_at.type),
+                ),
+            )
+            .returning(Member.household_id)
+            .cte("joined")
+        )
+        name = db.execute(
+            select(household.c.name).join(joined, joined.c.household_id == household.c.id)
+        ).scalar()
+    else:
+        found = db.execute(select(Household.id, Household.name).where(Household.join_code == join_code)).first()
+        name = None
+        if found is not None:
+            name = found.name
+            db.execute(insert(Member).values(household_id=found.id, name=member_name, token=token, created_at=now))
+    if name is None:
+        return None
+    db.commit()
+    return Membership(name, join_code, member_name, token)
+
+
+def get_member_by_token(db: Session, token: str) -> tuple[int, int, str] | None:
+    return db.query(Member.id, Member.household_id, Member.name).filter(Member.token == token).first()
+
+
+def add_item(
+    db: Session,
+    household_id: int,
+    member_id: int,
+    name: str,
+    location: str,
+    category: str,
+    raw_input: str,
+) -> tuple[int, datetime]:
+    """Insert one item and commit; returns its (id, created_at)."""
+    row = {"name": name, "location": location, "category": category, "raw_input": raw_input}
+    return add_items(db, household_id, member_id, [row])[0]
+
+
+def search_candidates(db: Session, household_id: int, query: str) -> list[Row]:
+    """The backend's text matches, plus items whose name sounds like query.
+
+    An item sounds like query when its phonetic key shares a word's code
+    with the query's. The second lookup matches the codes space-delimited,
+    so it reads only the household's entries in
+    ix_items_household_name_phonetic rather than the items themselves.
+    """
+    backend = search_backend.for_session(db)
+    rows = backend.candidates(db, household_id, query, search_backend.CANDIDATE_LIMIT)
+    if codes := phonetic.key(query).split():
+        found = {row.id for row in rows}
+        # Codes are A-Z and digits, so they need no LIKE escaping
+        padded = literal(" ") + Item.name_phonetic + " "
+        rows += [
+            row for row in db.execute(
+                select(*search_backend.CANDIDATE_COLUMNS)
+                .where(Item.household_id == household_id, or_(*(padded.like(f"% {code} %") for code in codes)))
+                .limit(search_backend.CANDIDATE_LIMIT)
+            ).all()
+            if row.id not in found
+        ]
+    return rows
+
+
+def add_items(db: Session, household_id: int, member_id: int, rows: list[dict]) -> list[tuple[int, datetime]]:
+    """Insert many items with one multi-row INSERT ... RETURNING and commit.
+
+    rows hold name/location/category/raw_input; the stored search fields
+    are added here. The returned (id, created_at) pairs are in the same order.
+    """
+    if not rows:
+        return []
+    # Asking SQLAlchemy to keep parameter order makes SQLite fall back to one
+    # INSERT per row, so returned rows are matched back up by their contents
+    result = db.execute(
+        insert(Item).returning(Item.id, Item.created_at, Item.name, Item.location, Item.raw_input),
+        [
+            {
+                "household_id": household_id,
+                "added_by": member_id,
+                **row,
+                **stored_fields(row["name"], row["location"], row["category"]),
+            }
+            for row in rows
+        ],
+    )
+    returned: dict[tuple, list[tuple[int, datetime]]] = defaultdict(list)
+    for item_id, created_at, *key in sorted(result.all(), reverse=True):
+        returned[tuple(key)].append((item_id, created_at))
+    db.commit()
+    return [returned[(row["name"], row["location"], row["raw_input"])].pop() for row in rows]
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{item_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on anything it didn't produce."""
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def list_items(
+    db: Session,
+    household_id: int,
+    category: str | None = None,
+    location: str | None = None,
+    limit: int = 100,
+    after: tuple[datetime, int] | None = None,
+) -> tuple[list[Row], str | None]:
+    """Return one page of the household's items, newest first, and the next page's cursor.
+
+    Columns are in ItemResponse's order so rows serialize as they are.
+
+    Pages are keyed on (created_at, id) so each one is an index range scan
+    rather than an OFFSET over everything before it.
+    """
+    query = (
+        select(
+            Item.id,
+            Item.name,
+            Item.location,
+            Item.category,
+            func.coalesce(Member.name, "Unknown").label("added_by"),
+            Item.created_at,
+        )
+        .outerjoin(Member, Member.id == Item.added_by)
+        .where(Item.household_id == household_id)
+    )
+
+    backend = search_backend.for_session(db)
+    if category:
+        query = query.where(backend.contains(db, household_id, Item.category, category))
+    if location:
+        query = query.where(backend.contains(db, household_id, Item.location, location))
+    if after:
+        query = query.where(tuple_(Item.created_at, Item.id) < tuple_(*after))
+
+    rows = db.execute(
+        query.order_by(Item.created_at.desc(), Item.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def export_items(household_id: int) -> Select:
+    """Every item in the household, oldest first, for database.stream_rows() to page through."""
+    return (
+        select(
+            Item.name,
+            Item.location,
+            Item.category,
+            Item.raw_input,
+            func.coalesce(Member.name, "Unknown").label("added_by"),
+            Item.created_at,
+        )
+        .outerjoin(Member, Member.id == Item.added_by)
+        .where(Item.household_id == household_id)
+        .order_by(Item.created_at, Item.id)
+    )
+
+
+def delete_item(db: Session, household_id: int, item_id: int) -> Row | None:
+    """Delete the item and commit; returns its (id, name), or None if the household has no such item."""
+    deleted = db.execute(
+        delete(Item)
+        .where(Item.id == item_id, Item.household_id == household_id)
+        .returning(Item.id, Item.name)
+    ).first()
+    db.commit()
+    return deleted
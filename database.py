@@ -1,20 +1,305 @@
+import asyncio
+import logging
 import os
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy import Executable, Row, create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-load_dotenv()
+import env  # noqa: F401 — loads .env before the settings below are read
+from timing import span
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./homebox.db")
 
-# Neon requires sslmode=require; SQLite doesn't support connect_args for SSL
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Async mode serves requests from an AsyncEngine (asyncpg / aiosqlite) on the
+# event loop instead of sync sessions on uvicorn's threadpool
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "").lower() in ("1", "true", "yes")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+# Pool settings. Neon suspends idle computes and drops their connections, so
+# connections are pinged on checkout and recycled well before that happens.
+# DB_POOL=null hands pooling to an external pooler (e.g. Neon's -pooler host).
+DB_POOL = os.getenv("DB_POOL", "queue")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "240"))
+POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# Connections opened at startup so the first burst of requests skips the TLS handshake
+POOL_WARM = int(os.getenv("DB_POOL_WARM", "0"))
+
+# Query profiling: per-request counts, slow statements and repeated shapes (N+1)
+SQL_PROFILE = _env_bool("SQL_PROFILE", False)
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+# The same statement this many times in one request is reported as an N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class PoolWaitStats:
+    """How long checkouts waited for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+
+pool_waits = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_waits.record(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_waits.record(time.perf_counter() - start)
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _pool_args(url: str, async_: bool = False) -> dict[str, Any]:
+    if _is_sqlite_memory(url):
+        # SQLite's in-memory database lives in a single connection
+        return {}
+    if DB_POOL == "null":
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": TimedAsyncQueuePool if async_ else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+        # Reuse the most recent connection so idle extras age out server-side
+        "pool_use_lifo": True,
+    }
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers proceed during a write; NORMAL skips the fsync per commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.get_backend_name() == "postgresql":
+        # asyncpg spells libpq's sslmode as ssl
+        query = dict(parsed.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return url
+
+
+# Built on first use by _create_engines(), through the module __getattr__ for
+# `database.engine` and friends, so importing the app doesn't load a driver
+_ENGINE_NAMES = ("engine", "SessionLocal", "async_engine", "AsyncSessionLocal")
+_engine_lock = threading.Lock()
+
+
+def _create_engines() -> None:
+    """Create the engines and session factories once; neither connects until a session is used."""
+    global engine, SessionLocal, async_engine, AsyncSessionLocal
+    if "engine" in globals():
+        return
+    with _engine_lock:
+        if "engine" in globals():
+            return
+        # Neon requires sslmode=require; SQLite doesn't support connect_args for SSL
+        connect_args = {}
+        if DATABASE_URL.startswith("sqlite"):
+            connect_args = {"check_same_thread": False}
+
+        sync_engine = create_engine(DATABASE_URL, connect_args=connect_args, **_pool_args(DATABASE_URL))
+        if DATABASE_URL.startswith("sqlite"):
+            event.listen(sync_engine, "connect", _sqlite_pragmas)
+
+        async_engine = None
+        AsyncSessionLocal = None
+        if DATABASE_ASYNC:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            async_engine = create_async_engine(async_url(DATABASE_URL), **_pool_args(DATABASE_URL, async_=True))
+            if DATABASE_URL.startswith("sqlite"):
+                event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+            AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        SessionLocal = sessionmaker(bind=sync_engine)
+        # Last, since its presence marks the rest as ready
+        engine = sync_engine
+
+
+def __getattr__(name: str) -> Any:
+    if name in _ENGINE_NAMES:
+        _create_engines()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# "IN (?, ?, ?)" varies with the length of the list, not with the query
+_IN_LISTS = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with whitespace and the length of IN lists normalized."""
+    return _IN_LISTS.sub("(...)", _SPACES.sub(" ", statement).strip())
+
+
+class QueryLog:
+    """Statements executed while a profile is active."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: list[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            self.statements.append(statement)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """Statement shapes run at least threshold times, most frequent first."""
+        shapes = Counter(statement_shape(statement) for statement in self.statements)
+        return [(shape, n) for shape, n in shapes.most_common() if n >= threshold]
+
+    def report(self) -> None:
+        for shape, n in self.repeated():
+            logger.warning("Possible N+1 in %s: %d x %s", self.label or "query profile", n, shape)
+
+
+_request_log: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+# Profiles that see every statement in the process, whichever thread or loop runs it
+_global_logs: list[QueryLog] = []
+_listening: set[Engine] = set()
+_listen_lock = threading.Lock()
+
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(bind=engine)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    log = _request_log.get()
+    if log is not None:
+        log.record(statement, seconds)
+    for log in _global_logs:
+        log.record(statement, seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s; parameters: %r", seconds * 1000, statement, parameters)
+
+
+def enable_profiling() -> None:
+    """Attach the cursor hooks to the request engines; until then queries run untimed."""
+    _create_engines()
+    with _listen_lock:
+        targets = [engine] if async_engine is None else [engine, async_engine.sync_engine]
+        for target in targets:
+            if target not in _listening:
+                event.listen(target, "before_cursor_execute", _before_cursor_execute)
+                event.listen(target, "after_cursor_execute", _after_cursor_execute)
+                _listening.add(target)
+
+
+@contextmanager
+def profile_queries(label: str = "") -> Iterator[QueryLog]:
+    """Record the statements run in this context, including run() calls made from it."""
+    enable_profiling()
+    log = QueryLog(label)
+    token = _request_log.set(log)
+    try:
+        yield log
+    finally:
+        _request_log.reset(token)
+        log.report()
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryLog]:
+    """Fail if more than limit statements run anywhere in the process inside the block.
+
+    Process-wide rather than per-context, so it also sees the queries a
+    TestClient request runs on the client's own event loop thread.
+    """
+    enable_profiling()
+    log = QueryLog("assert_max_queries")
+    _global_logs.append(log)
+    try:
+        yield log
+    finally:
+        _global_logs.remove(log)
+    if log.count > limit:
+        listing = "\n".join(f"  {statement_shape(statement)}" for statement in log.statements)
+        raise AssertionError(f"{log.count} queries, expected at most {limit}:\n{listing}")
+
+
+class QueryProfileMiddleware:
+    """Profiles the queries of each HTTP request when SQL_PROFILE is on."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with profile_queries(f"{scope['method']} {scope['path']}") as log:
+            await self.app(scope, receive, send)
+        logger.info("%s %s: %d queries in %.1f ms", scope["method"], scope["path"], log.count, log.seconds * 1000)
+
+
+if SQL_PROFILE:
+    enable_profiling()
 
 
 class Base(DeclarativeBase):
@@ -22,8 +307,114 @@ class Base(DeclarativeBase):
 
 
 def get_db():
+    _create_engines()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    _create_engines()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# The session dependency handlers should use; its sessions go through run()
+get_session = get_async_db if DATABASE_ASYNC else get_db
+
+
+@asynccontextmanager
+async def open_session() -> AsyncIterator[Session | AsyncSession]:
+    """A session for work that outlives the request's own, e.g. a streamed response."""
+    _create_engines()
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+T = TypeVar("T")
+
+
+async def run(db: Session | AsyncSession, fn: Callable[..., T], *args: Any) -> T:
+    """Call fn(session, *args) without blocking the event loop.
+
+    Async sessions run it through run_sync, so its queries go out on the async
+    driver; sync sessions run it on the threadpool as a sync handler would.
+    """
+    with span("db"):
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(fn, *args)
+        return await run_in_threadpool(fn, db, *args)
+
+
+async def stream_rows(db: Session | AsyncSession, statement: Executable, size: int) -> AsyncIterator[list[Row]]:
+    """Yield the statement's rows size at a time from a server-side cursor.
+
+    Only one batch is held in memory at once, however many rows match.
+    """
+    statement = statement.execution_options(yield_per=size)
+    if isinstance(db, AsyncSession):
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            yield partition
+        return
+    partitions = (await run_in_threadpool(db.execute, statement)).partitions()
+    while (partition := await run_in_threadpool(next, partitions, None)) is not None:
+        yield partition
+
+
+def _warm_count(n: int | None) -> int:
+    n = POOL_WARM if n is None else n
+    return min(n, POOL_SIZE) if DB_POOL != "null" else 0
+
+
+def warm_pool(n: int | None = None) -> int:
+    """Open n pooled connections in parallel and return them to the pool."""
+    n = _warm_count(n)
+    if n <= 0:
+        return 0
+    _create_engines()
+    with ThreadPoolExecutor(max_workers=n) as executor:
+        connections = list(executor.map(lambda _: engine.connect(), range(n)))
+    for connection in connections:
+        connection.close()
+    return n
+
+
+async def warm_pools(n: int | None = None) -> int:
+    """Pre-open connections on whichever engine serves requests."""
+    _create_engines()
+    if async_engine is None:
+        return await run_in_threadpool(warm_pool, n)
+    n = _warm_count(n)
+    if n <= 0:
+        return 0
+    connections = await asyncio.gather(*(async_engine.connect() for _ in range(n)))
+    for connection in connections:
+        await connection.close()
+    return n
+
+
+def pool_stats(target: Engine | None = None) -> dict[str, int | float]:
+    """Checkout counters for the pool serving requests."""
+    if target is None:
+        _create_engines()
+        target = async_engine.sync_engine if async_engine is not None else engine
+    pool = target.pool
+    queued = isinstance(pool, QueuePool)
+    return {
+        "size": pool.size() if queued else 0,
+        "checked_out": pool.checkedout() if queued else 0,
+        "checked_in": pool.checkedin() if queued else 0,
+        "overflow": max(pool.overflow(), 0) if queued else 0,
+        "waits": pool_waits.count,
+        "wait_total_ms": round(pool_waits.total * 1000, 3),
+        "wait_max_ms": round(pool_waits.max * 1000, 3),
+    }
@@ -0,0 +1,19 @@
+"""Loads .env into the environment.
+
+Every module that reads settings with os.getenv at import time imports this
+first, so .env applies whichever module happens to be imported first (the
+app, migrations.py, a benchmark). Hosts set the environment directly;
+python-dotenv is only imported when there's a .env to read.
+"""
+import os
+
+
+def _load_dotenv() -> None:
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+    if os.path.exists(path):
+        from dotenv import load_dotenv
+
+        load_dotenv(path)
+
+
+_load_dotenv()
@@ -0,0 +1,62 @@
+"""Memoized parse + categorize for POST /items and POST /items/bulk.
+
+Siri users repeat the same phrasings, so results are kept in an LRU keyed
+on the cleaned utterance (all parse() looks at) and the nlp/categories
+table versions, which reload() bumps when PATTERNS or CATEGORY_KEYWORDS
+change.
+"""
+import os
+from collections.abc import Iterable
+from typing import NamedTuple
+
+import categories
+import env  # noqa: F401 — loads .env before the settings below are read
+import nlp
+from cache import LRUCache
+
+MEMO_SIZE = int(os.getenv("INTERPRET_CACHE_SIZE", "4096"))
+
+_MISSING = object()
+
+
+class Interpretation(NamedTuple):
+    name: str
+    location: str
+    category: str
+
+
+memo = LRUCache(MEMO_SIZE)
+_versions = (nlp.version, categories.version)
+
+
+def _current_versions() -> tuple[int, int]:
+    global _versions
+    versions = (nlp.version, categories.version)
+    if versions != _versions:
+        # Old entries can never be looked up again; free the room now
+        _versions = versions
+        memo.clear()
+    return versions
+
+
+def interpret(raw_input: str) -> Interpretation | None:
+    """(item, location, category) for an utterance, or None if it can't be parsed."""
+    cleaned = nlp.clean(raw_input)
+    key = (_current_versions(), cleaned)
+    result = memo.get(key, _MISSING)
+    if result is _MISSING:
+        parsed = nlp.parse_cleaned(cleaned)
+        result = Interpretation(*parsed, categories.categorize(parsed[0])) if parsed else None
+        memo.set(key, result)
+    return result
+
+
+def interpret_many(raw_inputs: Iterable[str]) -> list[Interpretation | None]:
+    """interpret() over a batch, looking each distinct utterance up once."""
+    seen: dict[str, Interpretation | None] = {}
+    results = []
+    for raw_input in raw_inputs:
+        if raw_input not in seen:
+            seen[raw_input] = interpret(raw_input)
+        results.append(seen[raw_input])
+    return results
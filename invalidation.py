@@ -0,0 +1,251 @@
+"""Cross-process cache invalidation for multi-worker deployments.
+
+Each worker keeps its own search indexes, search results (unless they live
+in Redis) and token lookups. When one worker changes a household it updates
+its own caches and publishes an event; the others drop what they hold for
+that household and rebuild it on demand.
+
+Events travel over Postgres LISTEN/NOTIFY when the database is Postgres,
+or over unix datagram sockets in a directory shared by the workers of a
+SQLite deployment. With a single worker (WEB_CONCURRENCY unset or 1) there
+is nobody to tell and no channel is opened.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import tempfile
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy.engine import make_url
+
+import env  # noqa: F401 — loads .env before the settings below are read
+from auth import invalidate_household, invalidate_member
+from database import DATABASE_URL
+from search_cache import search_cache
+from search_index import household_index
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+# auto picks postgres or socket from DATABASE_URL when WORKERS > 1; none turns it off
+CHANNEL = os.getenv("INVALIDATION_CHANNEL", "auto")
+PEER_DIR = os.getenv("INVALIDATION_PEER_DIR") or os.path.join(
+    tempfile.gettempdir(), "homebox-" + hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:12]
+)
+NOTIFY_CHANNEL = "homebox_invalidate"
+
+# Event kinds, each carrying an id
+ITEMS = "items"  # household id: its items changed
+MEMBER = "member"  # member id: its token may no longer be valid
+HOUSEHOLD = "household"  # household id: drop everything cached for it
+EVERYTHING = "everything"  # events may have been missed; id unused
+
+Handler = Callable[[str, int], Awaitable[None]]
+
+
+def _encode(kind: str, key: int) -> bytes:
+    return json.dumps([kind, key]).encode()
+
+
+def _decode(payload: bytes | str) -> tuple[str, int]:
+    kind, key = json.loads(payload)
+    return kind, int(key)
+
+
+async def apply(kind: str, key: int) -> None:
+    """Drop what this process caches for an event published by a peer."""
+    if kind == EVERYTHING:
+        household_index.clear()
+        await search_cache.clear_local()
+        return
+    if kind in (ITEMS, HOUSEHOLD):
+        household_index.invalidate(key)
+        await search_cache.invalidate_local(key)
+    if kind == HOUSEHOLD:
+        invalidate_household(key)
+    elif kind == MEMBER:
+        invalidate_member(key)
+
+
+class _Channel:
+    def __init__(self):
+        self._tasks: set[asyncio.Task] = set()
+
+    def _dispatch(self, handler: Handler, payload: bytes | str) -> None:
+        try:
+            kind, key = _decode(payload)
+        except (ValueError, TypeError):
+            logger.warning("Ignoring malformed invalidation event %r", payload)
+            return
+        # Keep a reference so the task isn't collected mid-flight
+        task = asyncio.get_running_loop().create_task(handler(kind, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class SocketChannel(_Channel):
+    """Datagram sockets, one per worker, in a directory on the local host.
+
+    Publishing sends the event to every other socket in the directory;
+    sockets left behind by dead workers refuse the datagram and are removed.
+    """
+
+    def __init__(self, directory: str = PEER_DIR, name: str | None = None):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name or os.getpid()}.sock")
+        self._sock: socket.socket | None = None
+
+    async def start(self, handler: Handler) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        sock.bind(self.path)
+        self._sock = sock
+        asyncio.get_running_loop().add_reader(sock.fileno(), self._receive, handler)
+
+    def _receive(self, handler: Handler) -> None:
+        while True:
+            try:
+                payload = self._sock.recv(1024)
+            except BlockingIOError:
+                return
+            self._dispatch(handler, payload)
+
+    async def publish(self, kind: str, key: int) -> None:
+        payload = _encode(kind, key)
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".sock") or entry.path == self.path:
+                continue
+            try:
+                self._sock.sendto(payload, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                # The peer's queue is full, so it's stuck; its caches expire on their own
+                logger.warning("Invalidation queue full for %s; event dropped", entry.name)
+
+    async def stop(self) -> None:
+        if self._sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class PostgresChannel(_Channel):
+    """LISTEN/NOTIFY on a dedicated asyncpg connection.
+
+    Neon drops idle connections, and events sent while the listener is
+    reconnecting are lost, so after a reconnect the handler is told to
+    drop everything.
+    """
+
+    RECONNECT_DELAYS = (0.5, 1, 2, 5, 10)
+
+    def __init__(self, url: str = DATABASE_URL, channel: str = NOTIFY_CHANNEL):
+        super().__init__()
+        # asyncpg takes a plain libpq URL, sslmode included
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self._conn = None
+        self._handler: Handler | None = None
+        self._lock = asyncio.Lock()
+        self._reconnecting: asyncio.Task | None = None
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._notified)
+        conn.add_termination_listener(self._terminated)
+        self._conn = conn
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        await self._connect()
+
+    def _notified(self, conn, pid: int, channel: str, payload: str) -> None:
+        # Our own publishes come back to us too
+        if pid != conn.get_server_pid():
+            self._dispatch(self._handler, payload)
+
+    def _terminated(self, conn) -> None:
+        if self._handler is not None and self._reconnecting is None:
+            self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delays = itertools.chain(self.RECONNECT_DELAYS, itertools.repeat(self.RECONNECT_DELAYS[-1]))
+        try:
+            for delay in delays:
+                await asyncio.sleep(delay)
+                try:
+                    await self._connect()
+                except Exception as exc:  # asyncpg raises its own error types
+                    logger.warning("Invalidation listener reconnect failed: %s", exc)
+                    continue
+                await self._handler(EVERYTHING, 0)
+                return
+        finally:
+            self._reconnecting = None
+
+    async def publish(self, kind: str, key: int) -> None:
+        if self._conn is None or self._conn.is_closed():
+            return
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, _encode(kind, key).decode())
+
+    async def stop(self) -> None:
+        self._handler = None
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+def _make_channel() -> SocketChannel | PostgresChannel | None:
+    kind = CHANNEL
+    if kind == "auto":
+        if WORKERS <= 1:
+            return None
+        kind = "postgres" if make_url(DATABASE_URL).get_backend_name() == "postgresql" else "socket"
+    if kind == "postgres":
+        return PostgresChannel()
+    if kind == "socket":
+        return SocketChannel()
+    return None
+
+
+channel = _make_channel()
+
+
+async def start() -> None:
+    if channel is not None:
+        await channel.start(apply)
+
+
+async def stop() -> None:
+    if channel is not None:
+        await channel.stop()
+
+
+async def publish(kind: str, key: int) -> None:
+    """Tell the other workers; the caller has already updated its own caches."""
+    if channel is not None:
+        await channel.publish(kind, key)
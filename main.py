@@ -1,144 +1,365 @@
-from fastapi import Depends, FastAPI, Query
-from sqlalchemy.orm import Session
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Literal
 
-from auth import get_current_member
-from categories import categorize
-from database import Base, engine, get_db
-from models import Household, Item, Member
-from nlp import parse
+from fastapi import APIRouter, Depends, FastAPI, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import bulk
+import crud
+import database
+import env  # noqa: F401 — loads .env before the settings below are read
+import invalidation
+import search
+from auth import MemberRecord, get_current_member, token_cache
+from database import SQL_PROFILE, QueryProfileMiddleware, get_session, open_session, pool_stats, run, warm_pools
+from interpret import interpret, memo as interpret_memo
+from migrations import upgrade
+from models import normalize_join_code
 from schemas import (
     AddItemRequest,
     AddItemResponse,
+    BulkAddRequest,
+    BulkAddResponse,
+    BulkLineResult,
+    BulkProgress,
+    CacheStats,
     CreateHouseholdRequest,
     DeleteResponse,
+    DiagnosticsResponse,
     ErrorResponse,
     HealthResponse,
     HouseholdResponse,
+    ImportResponse,
     ItemListResponse,
     ItemResponse,
     JoinHouseholdRequest,
+    PoolStats,
     SearchRequest,
     SearchResponse,
-    SearchResultItem,
 )
-from search import fuzzy_search
+from responses import JSONResponse, ModelResponse, item_dicts, search_result_dicts
+from search import THRESHOLD
+from search_cache import search_cache
+from search_index import HouseholdIndex, household_index
+from timing import TimedRoute, TimingMiddleware, render_metrics, span
+
+logger = logging.getLogger(__name__)
+
+# When a worker applies pending migrations: "startup" before it takes requests,
+# "background" while it already does, or "off" when something else migrates
+# (serve.py does, once, before starting its workers)
+MIGRATIONS = os.getenv("MIGRATIONS", "startup")
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+
+async def _in_background(description: str, fn, *args) -> None:
+    try:
+        await run_in_threadpool(fn, *args)
+    except Exception:
+        logger.exception("Background %s failed", description)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    background = []
+    if MIGRATIONS == "startup":
+        await run_in_threadpool(upgrade, database.engine)
+    elif MIGRATIONS == "background":
+        background.append(asyncio.create_task(_in_background("migration", upgrade, database.engine)))
+    # numpy and rapidfuzz load while the first requests, which rarely search, are served
+    background.append(asyncio.create_task(_in_background("search preload", search.preload)))
+    await warm_pools()
+    await invalidation.start()
+    logger.info(
+        "Ready to serve: imports took %.0f ms, startup %.0f ms",
+        IMPORT_SECONDS * 1000, (time.perf_counter() - started) * 1000,
+    )
+    yield
+    await invalidation.stop()
+    await asyncio.gather(*background)
+
 
-Base.metadata.create_all(bind=engine)
+router = APIRouter(route_class=TimedRoute)
 
-app = FastAPI(title="Homebox", version="1.0.0")
+
+async def _search(
+    db: Session | AsyncSession, household_id: int, query: str, limit: int, threshold: int
+) -> list[tuple[Any, int]]:
+    key = await search_cache.key(household_id, query, limit=limit, threshold=threshold)
+    matches = await search_cache.get(key)
+    if matches is None:
+        matches = await _rank(db, household_id, query, limit, threshold)
+        await search_cache.set(key, matches)
+    return matches
+
+
+async def _rank(
+    db: Session | AsyncSession, household_id: int, query: str, limit: int, threshold: int
+) -> list[tuple[Any, int]]:
+    index = household_index.get(household_id)
+    if index is None and not household_index.is_oversize(household_id):
+        with span("load"):
+            index = await run(db, household_index.load, household_id)
+    if index is not None:
+        with span("search"):
+            return index.search(query, limit, threshold)
+
+    # Too big to hold in memory: the database picks candidates for rapidfuzz to rank
+    with span("load"):
+        rows = await run(db, crud.search_candidates, household_id, query)
+    with span("search"):
+        return HouseholdIndex(rows).search(query, limit, threshold)
 
 
 # --- Health ---
 
-@app.get("/health", response_model=HealthResponse)
-def health():
+@router.get("/health", response_model=HealthResponse)
+async def health():
     return {"status": "ok"}
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request and phase latency histograms in the Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/diagnostics", response_model=DiagnosticsResponse)
+async def diagnostics():
+    return DiagnosticsResponse(
+        caches={
+            "auth_tokens": CacheStats(**token_cache.stats()),
+            "interpret": CacheStats(**interpret_memo.stats()),
+            "search_index": CacheStats(**household_index.stats()),
+            "search_results": CacheStats(**search_cache.stats()),
+        },
+        pool=PoolStats(**pool_stats()),
+    )
+
+
 # --- Households ---
 
-@app.post("/households", response_model=HouseholdResponse | ErrorResponse)
-def create_household(body: CreateHouseholdRequest, db: Session = Depends(get_db)):
+@router.post("/households", response_model=HouseholdResponse | ErrorResponse)
+async def create_household(body: CreateHouseholdRequest, db: Session | AsyncSession = Depends(get_session)):
     if not body.household_name.strip() or not body.your_name.strip():
         return ErrorResponse(error="Household name and your name are required.")
 
-    household = Household(name=body.household_name.strip())
-    db.add(household)
-    db.flush()
-
-    member = Member(household_id=household.id, name=body.your_name.strip())
-    db.add(member)
-    db.commit()
-    db.refresh(household)
-    db.refresh(member)
-
-    return HouseholdResponse(
-        household_name=household.name,
-        join_code=household.join_code,
-        your_name=member.name,
-        token=member.token,
+    membership = await run(
+        db, crud.create_household, body.household_name.strip(), body.your_name.strip()
     )
+    return HouseholdResponse(**membership._asdict())
 
 
-@app.post("/households/join", response_model=HouseholdResponse | ErrorResponse)
-def join_household(body: JoinHouseholdRequest, db: Session = Depends(get_db)):
-    code = body.join_code.strip().upper()
-    household = db.query(Household).filter(Household.join_code == code).first()
-    if not household:
-        return ErrorResponse(error=f"No household found with code {code}. Check the code and try again.")
-
+@router.post("/households/join", response_model=HouseholdResponse | ErrorResponse)
+async def join_household(body: JoinHouseholdRequest, db: Session | AsyncSession = Depends(get_session)):
+    code = normalize_join_code(body.join_code)
     if not body.your_name.strip():
         return ErrorResponse(error="Your name is required.")
 
-    member = Member(household_id=household.id, name=body.your_name.strip())
-    db.add(member)
-    db.commit()
-    db.refresh(member)
+    membership = await run(db, crud.join_household, code, body.your_name.strip())
+    if membership is None:
+        return ErrorResponse(error=f"No household found with code {code}. Check the code and try again.")
+    return HouseholdResponse(**membership._asdict())
+
+
+@router.get("/households/export", response_model=None)
+async def export_household(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    member: MemberRecord | None = Depends(get_current_member),
+):
+    """Every item in the household, streamed as NDJSON or CSV that /households/import reads back."""
+    if not member:
+        return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    return HouseholdResponse(
-        household_name=household.name,
-        join_code=household.join_code,
-        your_name=member.name,
-        token=member.token,
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        bulk.export(member.household_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="homebox-export.{format}"'},
     )
 
 
+@router.post(
+    "/households/import",
+    response_model=ImportResponse | ErrorResponse,
+    openapi_extra={"requestBody": {"content": {
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        "text/csv": {"schema": {"type": "string"}},
+        "text/plain": {"schema": {"type": "string"}},
+    }}},
+)
+async def import_household(
+    request: Request,
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
+):
+    """Add every item in an upload of any size, such as a /households/export file.
+
+    The upload is read as it arrives and committed bulk.BATCH_SIZE lines at a time.
+    """
+    if not member:
+        return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
+
+    added = failed = 0
+    errors: list[BulkLineResult] = []
+    content_type = request.headers.get("content-type", "")
+    try:
+        async for results in bulk.import_upload(db, member, content_type, request.stream()):
+            for result in results:
+                if result.item:
+                    added += 1
+                    continue
+                failed += 1
+                if len(errors) < bulk.IMPORT_ERRORS_SHOWN:
+                    errors.append(result)
+    except ValueError as exc:
+        if added:
+            return ErrorResponse(error=f"{exc} The {added} items before it were added.")
+        return ErrorResponse(error=str(exc))
+
+    if not added and not failed:
+        return ErrorResponse(error="There was nothing to add.")
+    return ModelResponse(ImportResponse(message=_bulk_message(added, failed), added=added, failed=failed, errors=errors))
+
+
 # --- Items ---
 
-@app.post("/items", response_model=AddItemResponse | ErrorResponse)
-def add_item(
+@router.post("/items", response_model=AddItemResponse | ErrorResponse)
+async def add_item(
     body: AddItemRequest,
-    member: Member | None = Depends(get_current_member),
-    db: Session = Depends(get_db),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
 ):
     if not member:
         return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    result = parse(body.raw_input)
+    with span("parse"):
+        result = interpret(body.raw_input)
     if result is None:
         return ErrorResponse(
             error="I couldn't understand that. Try something like: 'the drill is in the garage' or 'drill, garage'."
         )
 
-    item_name, location = result
-    category = categorize(item_name)
+    item_name, location, category = result
 
-    item = Item(
-        household_id=member.household_id,
-        added_by=member.id,
-        name=item_name,
-        location=location,
-        category=category,
-        raw_input=body.raw_input,
+    item_id, created_at = await run(
+        db, crud.add_item,
+        member.household_id, member.id, item_name, location, category, body.raw_input,
     )
-    db.add(item)
-    db.commit()
-    db.refresh(item)
+    household_index.add_item(member.household_id, item_id, item_name, location, category)
+    await search_cache.invalidate(member.household_id)
+    await invalidation.publish(invalidation.ITEMS, member.household_id)
 
     return AddItemResponse(
         message=f"Got it. {item_name} is in {location}.",
         item=ItemResponse(
-            id=item.id,
-            name=item.name,
-            location=item.location,
-            category=item.category,
+            id=item_id,
+            name=item_name,
+            location=location,
+            category=category,
             added_by=member.name,
-            created_at=item.created_at,
+            created_at=created_at,
         ),
     )
 
 
-@app.post("/search", response_model=SearchResponse | ErrorResponse)
-def search_items_post(
+def _bulk_message(added: int, failed: int) -> str:
+    message = f"Added {added} item{'s' if added != 1 else ''}."
+    if failed:
+        message += f" {failed} line{'s' if failed != 1 else ''} couldn't be understood."
+    return message
+
+
+async def _stream_bulk(member: MemberRecord, lines: list[bulk.BulkLine]):
+    """NDJSON: every line's result, then a progress record after each committed batch."""
+    processed = added = 0
+    async with open_session() as db:
+        async for results in bulk.ingest(db, member, lines):
+            for result in results:
+                yield result.model_dump_json(exclude_none=True) + "\n"
+            processed += len(results)
+            added += sum(1 for result in results if result.item)
+            progress = BulkProgress(processed=processed, total=len(lines), added=added, failed=processed - added)
+            yield progress.model_dump_json() + "\n"
+
+
+@router.post(
+    "/items/bulk",
+    response_model=BulkAddResponse | ErrorResponse,
+    openapi_extra={"requestBody": {"content": {
+        "application/json": {"schema": BulkAddRequest.model_json_schema()},
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        "text/csv": {"schema": {"type": "string"}},
+        "text/plain": {"schema": {"type": "string"}},
+    }}},
+)
+async def add_items_bulk(
+    request: Request,
+    stream: bool = Query(False),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
+):
+    """Add many items at once from {"lines": [...]}, or an NDJSON, CSV or plain-text upload.
+
+    With ?stream=true (or Accept: application/x-ndjson) results stream back as
+    NDJSON, with a progress record after each batch is committed.
+    """
+    if not member:
+        return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
+
+    content_type = request.headers.get("content-type", "")
+    body = await request.body()
+    try:
+        if content_type.startswith("application/json"):
+            lines = bulk.from_utterances(BulkAddRequest.model_validate_json(body).lines)
+        else:
+            lines = bulk.read_upload(content_type, body)
+    except ValidationError:
+        return ErrorResponse(error='Send {"lines": ["the drill is in the garage", ...]}.')
+    except ValueError as exc:
+        return ErrorResponse(error=str(exc))
+
+    if not lines:
+        return ErrorResponse(error="There was nothing to add.")
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(_stream_bulk(member, lines), media_type="application/x-ndjson")
+
+    results: list[BulkLineResult] = [
+        result async for batch in bulk.ingest(db, member, lines) for result in batch
+    ]
+    added = sum(1 for result in results if result.item)
+    return ModelResponse(BulkAddResponse(
+        message=_bulk_message(added, len(results) - added),
+        added=added,
+        failed=len(results) - added,
+        results=results,
+    ))
+
+
+@router.post("/search", response_model=SearchResponse | ErrorResponse)
+async def search_items_post(
     body: SearchRequest,
-    member: Member | None = Depends(get_current_member),
-    db: Session = Depends(get_db),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
 ):
     if not member:
         return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    all_items = db.query(Item).filter(Item.household_id == member.household_id).all()
-    matches = fuzzy_search(all_items, body.query)
+    matches = await _search(db, member.household_id, body.query, body.limit, body.threshold)
 
     if not matches:
         message = "I didn't find anything matching that."
@@ -146,102 +367,76 @@ def search_items_post(
         parts = [f"{item.name} is in {item.location}" for item, score in matches[:3]]
         message = ". ".join(parts) + "."
 
-    return SearchResponse(
-        query=body.query,
-        message=message,
-        results=[
-            SearchResultItem(
-                id=item.id, name=item.name, location=item.location,
-                category=item.category, score=score,
-            )
-            for item, score in matches
-        ],
-    )
+    return JSONResponse({"query": body.query, "message": message, "results": search_result_dicts(matches)})
 
 
-@app.get("/items/search", response_model=SearchResponse | ErrorResponse)
-def search_items(
+@router.get("/items/search", response_model=SearchResponse | ErrorResponse)
+async def search_items(
     q: str = Query(..., min_length=1),
-    member: Member | None = Depends(get_current_member),
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=500),
+    threshold: int = Query(THRESHOLD, ge=0, le=100),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
 ):
     if not member:
         return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    all_items = db.query(Item).filter(Item.household_id == member.household_id).all()
-    matches = fuzzy_search(all_items, q)
-
-    return SearchResponse(
-        query=q,
-        results=[
-            SearchResultItem(
-                id=item.id,
-                name=item.name,
-                location=item.location,
-                category=item.category,
-                score=score,
-            )
-            for item, score in matches
-        ],
-    )
+    matches = await _search(db, member.household_id, q, limit, threshold)
 
+    return JSONResponse({"query": q, "message": "", "results": search_result_dicts(matches)})
 
-@app.get("/items", response_model=ItemListResponse | ErrorResponse)
-def list_items(
+
+@router.get("/items", response_model=ItemListResponse | ErrorResponse)
+async def list_items(
     category: str | None = Query(None),
     location: str | None = Query(None),
-    member: Member | None = Depends(get_current_member),
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
 ):
     if not member:
         return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    query = db.query(Item).filter(Item.household_id == member.household_id)
-
-    if category:
-        query = query.filter(Item.category.ilike(f"%{category}%"))
-    if location:
-        query = query.filter(Item.location.ilike(f"%{location}%"))
-
-    items = query.order_by(Item.created_at.desc()).all()
-
-    # We need member names for the response — batch lookup
-    member_ids = {i.added_by for i in items}
-    members = {m.id: m.name for m in db.query(Member).filter(Member.id.in_(member_ids)).all()} if member_ids else {}
-
-    return ItemListResponse(
-        count=len(items),
-        items=[
-            ItemResponse(
-                id=i.id,
-                name=i.name,
-                location=i.location,
-                category=i.category,
-                added_by=members.get(i.added_by, "Unknown"),
-                created_at=i.created_at,
-            )
-            for i in items
-        ],
+    try:
+        after = crud.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return ErrorResponse(error="Invalid cursor. Start again from the first page.")
+
+    rows, next_cursor = await run(
+        db, crud.list_items, member.household_id, category, location, limit, after
     )
 
+    return JSONResponse({"count": len(rows), "items": item_dicts(rows), "next_cursor": next_cursor})
+
 
-@app.delete("/items/{item_id}", response_model=DeleteResponse | ErrorResponse)
-def delete_item(
+@router.delete("/items/{item_id}", response_model=DeleteResponse | ErrorResponse)
+async def delete_item(
     item_id: int,
-    member: Member | None = Depends(get_current_member),
-    db: Session = Depends(get_db),
+    member: MemberRecord | None = Depends(get_current_member),
+    db: Session | AsyncSession = Depends(get_session),
 ):
     if not member:
         return ErrorResponse(error="Invalid or missing token. Run Setup Homebox first.")
 
-    item = (
-        db.query(Item)
-        .filter(Item.id == item_id, Item.household_id == member.household_id)
-        .first()
-    )
+    item = await run(db, crud.delete_item, member.household_id, item_id)
     if not item:
         return ErrorResponse(error="Item not found.")
 
-    db.delete(item)
-    db.commit()
+    household_index.remove_item(member.household_id, item.id)
+    await search_cache.invalidate(member.household_id)
+    await invalidation.publish(invalidation.ITEMS, member.household_id)
     return DeleteResponse(message=f"Deleted {item.name}.")
+
+
+def create_app() -> FastAPI:
+    """The API; nothing touches the database until its lifespan starts or a request needs it."""
+    app = FastAPI(title="Homebox", version="1.0.0", lifespan=lifespan, default_response_class=JSONResponse)
+    app.include_router(router)
+    app.add_middleware(TimingMiddleware)
+    if SQL_PROFILE:
+        app.add_middleware(QueryProfileMiddleware)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,168 @@
+"""Schema migrations.
+
+Each migration runs once, in order, and the highest applied version is
+recorded in the schema_version table. Migrations must be idempotent: the
+first one creates the schema from the current models, so later ones check
+what already exists before changing anything.
+
+Run pending migrations with `python migrations.py`. Columns a migration
+adds to existing rows are filled in afterwards, a batch at a time, by
+`python migrations.py backfill` (see backfill_search_fields).
+"""
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column, Connection, DateTime, Engine, Integer, MetaData, String, Table, bindparam, inspect, or_, select, text,
+    update,
+)
+from sqlalchemy.schema import CreateColumn
+
+import models  # noqa: F401 — registers the tables on Base.metadata
+import search_backend
+from database import Base
+from search import NORMALIZED_FIELDS
+from search_index import STORED_FIELDS, stored_fields
+
+BACKFILL_BATCH_SIZE = 1000
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime(timezone=True)),
+)
+
+
+def _create_indexes(conn: Connection, table: str, names: list[str]) -> None:
+    existing = {index["name"] for index in inspect(conn).get_indexes(table)}
+    for index in Base.metadata.tables[table].indexes:
+        if index.name in names and index.name not in existing:
+            index.create(conn)
+
+
+def _initial_schema(conn: Connection) -> None:
+    Base.metadata.create_all(conn)
+
+
+def _household_indexes(conn: Connection) -> None:
+    _create_indexes(conn, "items", ["ix_items_household_created", "ix_items_household_category"])
+    _create_indexes(conn, "members", ["ix_members_household_id"])
+
+
+def _text_search_indexes(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        for statement in search_backend.POSTGRES_TRGM_DDL:
+            conn.execute(text(statement))
+    elif conn.dialect.name == "sqlite" and search_backend.SQLITE_FTS:
+        existed = inspect(conn).has_table("items_fts")
+        for statement in search_backend.SQLITE_FTS_DDL:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text(search_backend.SQLITE_FTS_REBUILD))
+
+
+def _add_columns(conn: Connection, table: str, names: list[str]) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name in names:
+        if name not in existing:
+            column = CreateColumn(Base.metadata.tables[table].c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}"))
+
+
+def _normalized_search_columns(conn: Connection) -> None:
+    _add_columns(conn, "items", list(NORMALIZED_FIELDS))
+
+
+def _phonetic_name_column(conn: Connection) -> None:
+    _add_columns(conn, "items", ["name_phonetic"])
+    _create_indexes(conn, "items", ["ix_items_household_name_phonetic"])
+
+
+def _fts_update_trigger_on_text_columns(conn: Connection) -> None:
+    if conn.dialect.name == "sqlite" and search_backend.SQLITE_FTS:
+        # Created by migration 3 to fire on any UPDATE of items
+        conn.execute(text("DROP TRIGGER IF EXISTS items_fts_au"))
+        conn.execute(text(next(ddl for ddl in search_backend.SQLITE_FTS_DDL if "items_fts_au" in ddl)))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial schema", _initial_schema),
+    (2, "household indexes on items and members", _household_indexes),
+    (3, "trigram text search indexes on items", _text_search_indexes),
+    (4, "normalized search columns on items", _normalized_search_columns),
+    (5, "indexed phonetic key of item names", _phonetic_name_column),
+    (6, "items_fts update trigger only for text columns", _fts_update_trigger_on_text_columns),
+]
+
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def upgrade(engine: Engine) -> list[int]:
+    """Apply pending migrations in one transaction; returns the versions applied."""
+    applied = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Serialize concurrent upgrades from several workers
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('homebox_schema'))"))
+        schema_version.create(conn, checkfirst=True)
+        version = current_version(conn)
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            migrate(conn)
+            conn.execute(schema_version.insert().values(
+                version=number, description=description, applied_at=datetime.now(timezone.utc),
+            ))
+            applied.append(number)
+    return applied
+
+
+def backfill_search_fields(engine: Engine, batch_size: int = BACKFILL_BATCH_SIZE, all_rows: bool = False) -> int:
+    """Fill in the stored search columns, one transaction per batch; returns rows written.
+
+    Rows written before migrations 4 and 5 have them NULL; all_rows rewrites
+    every row, for after search.normalize() or phonetic.key() changes. Search
+    works out what's missing as it goes (except phonetic matches in
+    households too big for the in-memory index), so this can run while the
+    app serves requests.
+    """
+    items = Base.metadata.tables["items"]
+    pending = or_(*(items.c[name].is_(None) for name in STORED_FIELDS))
+    # The SET clause comes from each parameter set's column keys
+    statement = update(items).where(items.c.id == bindparam("item_id"))
+    written, after = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(items.c.id, items.c.name, items.c.location, items.c.category)
+                .where(items.c.id > after, *(() if all_rows else (pending,)))
+                .order_by(items.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return written
+            conn.execute(statement, [
+                {"item_id": item_id, **stored_fields(name, location, category)}
+                for item_id, name, location, category in rows
+            ])
+        written += len(rows)
+        after = rows[-1].id
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import engine
+
+    if sys.argv[1:2] == ["backfill"]:
+        written = backfill_search_fields(engine, all_rows="--all" in sys.argv)
+        print(f"Search fields written for {written} items.")
+    else:
+        applied = upgrade(engine)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
@@ -1,7 +1,8 @@
+import secrets
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, ForeignKey, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -15,8 +16,19 @@ def _uuid() -> str:
     return uuid.uuid4().hex
 
 
+# Letters and digits without the look- and sound-alikes 0/O and 1/I/L: 31^6 is
+# about 887M codes. Older codes are six hex digits, which still fit the column.
+JOIN_CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+JOIN_CODE_LENGTH = 6
+
+
 def _join_code() -> str:
-    return uuid.uuid4().hex[:6].upper()
+    return "".join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+
+
+def normalize_join_code(code: str) -> str:
+    """Codes as typed or dictated: any case, with spaces or dashes between characters."""
+    return "".join(code.split()).replace("-", "").upper()
 
 
 class Household(Base):
@@ -35,7 +47,7 @@ class Member(Base):
     __tablename__ = "members"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    household_id: Mapped[int] = mapped_column(ForeignKey("households.id"))
+    household_id: Mapped[int] = mapped_column(ForeignKey("households.id"), index=True)
     name: Mapped[str] = mapped_column(String(200))
     token: Mapped[str] = mapped_column(String(32), unique=True, default=_uuid)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
@@ -46,6 +58,13 @@ class Member(Base):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # list_items: newest first within a household
+        Index("ix_items_household_created", "household_id", "created_at"),
+        Index("ix_items_household_category", "household_id", "category"),
+        # Items whose name sounds like a search query (phonetic.py)
+        Index("ix_items_household_name_phonetic", "household_id", "name_phonetic"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     household_id: Mapped[int] = mapped_column(ForeignKey("households.id"))
@@ -54,6 +73,13 @@ class Item(Base):
     location: Mapped[str] = mapped_column(String(300))
     category: Mapped[str] = mapped_column(String(100), default="Other")
     raw_input: Mapped[str] = mapped_column(Text)
+    # search.normalize() of name/location/category and phonetic.key() of name,
+    # written with the item; NULL until migrations.backfill_search_fields()
+    # reaches rows from before them
+    name_normalized: Mapped[str | None] = mapped_column(String(300))
+    location_normalized: Mapped[str | None] = mapped_column(String(300))
+    category_normalized: Mapped[str | None] = mapped_column(String(100))
+    name_phonetic: Mapped[str | None] = mapped_column(String(300))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
 
@@ -1,38 +1,84 @@
 import re
 
 FILLER_WORDS = re.compile(
-    r"\b(um|uh|like|so|well|okay|oh|actually|basically|i think|you know)\b",
+    # The lookahead lists the fillers' first letters so most positions are
+    # rejected before trying each alternative
+    r"\b(?=[ablosuwiy])(um|uh|like|so|well|okay|oh|actually|basically|i think|you know)\b",
     re.IGNORECASE,
 )
 
 LEADING_ARTICLES = re.compile(r"^(the|a|an|my|our|some)\s+", re.IGNORECASE)
+WHITESPACE_RUNS = re.compile(r"\s{2,}")
 
 # Patterns tried in order — first match wins.
-# Each returns (item, location) from the match groups.
-PATTERNS: list[tuple[re.Pattern, tuple[int, int]]] = [
+# Each returns (item, location) from the match groups, and may name a
+# substring the text must contain for the pattern to be worth trying.
+PATTERNS: list[tuple[re.Pattern, tuple[int, int], str | None]] = [
     # "X is/are in/on/under/behind/at Y"
-    (re.compile(r"^(.+?)\s+(?:is|are)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2)),
+    (re.compile(r"^(.+?)\s+(?:is|are)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2), None),
     # "[I/we] [am/was] put/putting/stored/storing/left/placed/keep X in/on/under Y
-    (re.compile(r"^(?:(?:i(?:'m)?|we(?:'re)?)\s+)?(?:am\s+|was\s+|were\s+)?(?:put|putting|stored|storing|left|leaving|placed|placing|keep|keeping|kept)\s+(.+?)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2)),
+    (re.compile(r"^(?:(?:i(?:'m)?|we(?:'re)?)\s+)?(?:am\s+|was\s+|were\s+)?(?:put|putting|stored|storing|left|leaving|placed|placing|keep|keeping|kept)\s+(.+?)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2), None),
     # "X, Y" (comma fallback)
-    (re.compile(r"^(.+?)\s*,\s*(.+)$"), (1, 2)),
+    (re.compile(r"^(.+?)\s*,\s*(.+)$"), (1, 2), ","),
     # "X in/on/under Y" (bare preposition)
-    (re.compile(r"^(.+?)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2)),
+    (re.compile(r"^(.+?)\s+(?:in|on|under|behind|at|inside|next to)\s+(.+)$", re.IGNORECASE), (1, 2), None),
     # "Y has/contains X" (inverted — swap groups)
-    (re.compile(r"^(.+?)\s+(?:has|contains|holds)\s+(.+)$", re.IGNORECASE), (2, 1)),
+    (re.compile(r"^(.+?)\s+(?:has|contains|holds)\s+(.+)$", re.IGNORECASE), (2, 1), None),
 ]
 
+# Longest separator any pattern puts between its groups once whitespace is
+# collapsed (" are next to " is 13 characters), rounded up.
+_MAX_SEPARATOR = 16
+# Longest text ahead of the first group ("we're were keeping " is 19).
+_MAX_PREFIX = 24
 
-def _clean(text: str) -> str:
-    """Pre-process raw dictated text."""
-    text = text.strip()
+
+def _multiline_variant(pattern: re.Pattern) -> re.Pattern:
+    """The same pattern for text with a line break in it.
+
+    Neither group can contain a newline, so unless the line breaks are all
+    in the leading words (see _match_multiline), a match has to put its
+    separator across the first one. The lookahead rejects first groups that
+    end too far from it without scanning to the end of the line, which is
+    what makes the original pattern quadratic on such input.
+    """
+    source = pattern.pattern.replace("(.+?)", rf"(.+?)(?=[^\n]{{0,{_MAX_SEPARATOR}}}\n)", 1)
+    return re.compile(source, pattern.flags)
+
+
+def _compile_patterns(patterns) -> list[tuple[re.Pattern, re.Pattern, tuple[int, int], str | None]]:
+    return [(pattern, _multiline_variant(pattern), groups, required) for pattern, groups, required in patterns]
+
+
+_COMPILED = _compile_patterns(PATTERNS)
+# Bumped by reload() so memoized parses (interpret.py) know to start over
+version = 0
+
+
+def reload() -> None:
+    """Recompile the line-break variants after PATTERNS changes."""
+    global _COMPILED, version
+    _COMPILED = _compile_patterns(PATTERNS)
+    version += 1
+
+
+def _match_multiline(pattern: re.Pattern, multiline_pattern: re.Pattern, text: str) -> re.Match | None:
+    m = multiline_pattern.match(text)
+    if m is None and text.rfind("\n") < _MAX_PREFIX:
+        # Line breaks only in "I put ..." words: the rest is one line, which
+        # the original pattern handles in linear time
+        m = pattern.match(text)
+    return m
+
+
+def clean(text: str) -> str:
+    """Pre-process raw dictated text; parse() depends only on the result."""
     # Strip trailing punctuation
-    text = re.sub(r"[.!?]+$", "", text)
+    text = text.strip().rstrip(".!?")
     # Remove filler words
     text = FILLER_WORDS.sub("", text)
     # Collapse whitespace
-    text = re.sub(r"\s{2,}", " ", text).strip()
-    return text
+    return WHITESPACE_RUNS.sub(" ", text).strip()
 
 
 def _strip_articles(text: str) -> str:
@@ -42,12 +88,23 @@ def _strip_articles(text: str) -> str:
 
 def parse(raw_input: str) -> tuple[str, str] | None:
     """Parse natural language into (item, location). Returns None on failure."""
-    cleaned = _clean(raw_input)
+    return parse_cleaned(clean(raw_input))
+
+
+def parse_cleaned(cleaned: str) -> tuple[str, str] | None:
+    """parse() for text that has already been through clean()."""
     if not cleaned:
         return None
 
-    for pattern, (item_group, loc_group) in PATTERNS:
-        m = pattern.match(cleaned)
+    multiline = "\n" in cleaned
+
+    for pattern, multiline_pattern, (item_group, loc_group), required in _COMPILED:
+        if required is not None and required not in cleaned:
+            continue
+        if multiline:
+            m = _match_multiline(pattern, multiline_pattern, cleaned)
+        else:
+            m = pattern.match(cleaned)
         if m:
             item = _strip_articles(m.group(item_group).strip())
             location = _strip_articles(m.group(loc_group).strip())
@@ -55,3 +112,4 @@ def parse(raw_input: str) -> tuple[str, str] | None:
                 return item, location
 
     return None
+
@@ -0,0 +1,106 @@
+"""Phonetic keys for matching item names Siri transcribed by ear.
+
+A key is the Metaphone code of each word, so "wrench" and "ranch" both
+become RNX. Letters dictated one at a time are joined back into a word
+first ("h d m i" is HDMI). Items store the key of their name in an indexed
+column, and an item sounds like a query when the two keys share a word's
+code, so "ranch" finds "socket wrench" (RNX SKT) without comparing sounds
+row by row.
+
+The encoder is a simplified Metaphone for English: no Double Metaphone
+alternates, and digits are kept as they are.
+"""
+import re
+
+from search import normalize
+
+VOWELS = frozenset("AEIOU")
+# Initial pairs whose first letter is silent
+_SILENT_FIRST = ("AE", "GN", "KN", "PN", "WR")
+# Single letters with a space or dot between them: "h d m i", "u.s.b."
+_SPELLED_OUT = re.compile(r"\b[a-z](?:[\s.]+[a-z]\b)+")
+_NOT_LETTER = re.compile(r"[^a-z]")
+
+
+def metaphone(word: str) -> str:
+    """The Metaphone code of one word; letters other than A-Z are ignored."""
+    w = "".join(ch for ch in word.upper() if "A" <= ch <= "Z")
+    if not w:
+        return ""
+    if w.startswith(_SILENT_FIRST):
+        w = w[1:]
+    elif w[0] == "X":
+        w = "S" + w[1:]
+    elif w.startswith("WH"):
+        w = "W" + w[2:]
+
+    def at(i: int) -> str:
+        return w[i] if 0 <= i < len(w) else ""
+
+    code = []
+    for i, ch in enumerate(w):
+        prev, after = at(i - 1), at(i + 1)
+        if ch == prev and ch != "C":
+            continue
+        if ch in VOWELS:
+            if i == 0:
+                code.append(ch)
+        elif ch == "B":
+            if not (prev == "M" and i == len(w) - 1):
+                code.append("B")
+        elif ch == "C":
+            if after == "I" and at(i + 2) == "A" or after == "H" and prev != "S":
+                code.append("X")
+            elif after in ("I", "E", "Y"):
+                if prev != "S":
+                    code.append("S")
+            else:
+                code.append("K")
+        elif ch == "D":
+            code.append("J" if after == "G" and at(i + 2) in ("E", "I", "Y") else "T")
+        elif ch == "G":
+            if after == "H" and at(i + 2) and at(i + 2) not in VOWELS:
+                continue
+            if after == "N" and (i + 2 == len(w) or w[i + 2:] == "ED"):
+                continue
+            if prev == "D" and after in ("E", "I", "Y"):
+                continue
+            code.append("J" if after in ("E", "I", "Y") else "K")
+        elif ch == "H":
+            if after in VOWELS and prev not in ("C", "S", "P", "T", "G"):
+                code.append("H")
+        elif ch == "K":
+            if prev != "C":
+                code.append("K")
+        elif ch == "P":
+            code.append("F" if after == "H" else "P")
+        elif ch == "Q":
+            code.append("K")
+        elif ch == "S":
+            code.append("X" if after == "H" or after == "I" and at(i + 2) in ("O", "A") else "S")
+        elif ch == "T":
+            if after == "I" and at(i + 2) in ("O", "A"):
+                code.append("X")
+            elif after == "H":
+                code.append("0")
+            elif not (after == "C" and at(i + 2) == "H"):
+                code.append("T")
+        elif ch == "V":
+            code.append("F")
+        elif ch in ("W", "Y"):
+            if after in VOWELS:
+                code.append(ch)
+        elif ch == "X":
+            code.append("KS")
+        elif ch == "Z":
+            code.append("S")
+        else:
+            code.append(ch)
+    return "".join(code)
+
+
+def key(text: str) -> str:
+    """The phonetic key of a name or query: its words' codes, deduplicated and sorted."""
+    text = _SPELLED_OUT.sub(lambda m: _NOT_LETTER.sub("", m.group()), text.lower())
+    codes = {word if word.isdigit() else metaphone(word) for word in normalize(text).split()}
+    return " ".join(sorted(code for code in codes if code))
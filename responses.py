@@ -0,0 +1,45 @@
+"""JSON responses for main.py.
+
+JSONResponse (orjson) is the app's default response class. Handlers
+returning a list of rows build it with item_dicts() / search_result_dicts()
+straight from the column tuples and return the response itself, so FastAPI
+neither builds nor re-validates a Pydantic object per row. ModelResponse
+does the same for a model the handler has already built. The schemas
+still document the shape through response_model; tests/test_api.py checks
+the fast path produces what they would.
+"""
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from schemas import ItemResponse, SearchResultItem
+
+# Key order as the schemas declare it
+ITEM_FIELDS = tuple(ItemResponse.model_fields)
+SEARCH_RESULT_FIELDS = tuple(SearchResultItem.model_fields)
+
+
+class JSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        # UTC as "Z", the way Pydantic writes it
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ModelResponse(JSONResponse):
+    """An internally built model, serialized once without being validated again."""
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+def item_dicts(rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """Rows of (id, name, location, category, added_by, created_at)."""
+    return [dict(zip(ITEM_FIELDS, row)) for row in rows]
+
+
+def search_result_dicts(matches: Iterable[tuple[Sequence[Any], int]]) -> list[dict[str, Any]]:
+    """(item, score) pairs, where item is (id, name, location, category)."""
+    return [dict(zip(SEARCH_RESULT_FIELDS, (*item, score))) for item, score in matches]
@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from search import THRESHOLD
 
 
 # --- Households ---
@@ -30,6 +32,9 @@ class AddItemRequest(BaseModel):
 
 class SearchRequest(BaseModel):
     query: str
+    # Siri reads out the top three
+    limit: int = Field(3, ge=1, le=100)
+    threshold: int = Field(THRESHOLD, ge=0, le=100)
 
 
 class ItemResponse(BaseModel):
@@ -62,9 +67,43 @@ class SearchResponse(BaseModel):
     results: list[SearchResultItem]
 
 
+class BulkAddRequest(BaseModel):
+    lines: list[str]
+
+
+class BulkLineResult(BaseModel):
+    line: int
+    raw_input: str
+    item: ItemResponse | None = None
+    error: str | None = None
+
+
+class BulkProgress(BaseModel):
+    processed: int
+    total: int
+    added: int
+    failed: int
+
+
+class BulkAddResponse(BaseModel):
+    message: str
+    added: int
+    failed: int
+    results: list[BulkLineResult]
+
+
+class ImportResponse(BaseModel):
+    message: str
+    added: int
+    failed: int
+    # The first few lines that couldn't be added
+    errors: list[BulkLineResult]
+
+
 class ItemListResponse(BaseModel):
     count: int
     items: list[ItemResponse]
+    next_cursor: str | None = None
 
 
 class DeleteResponse(BaseModel):
@@ -81,3 +120,29 @@ class ErrorResponse(BaseModel):
 
 class HealthResponse(BaseModel):
     status: str
+
+
+# --- Diagnostics ---
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    waits: int
+    wait_total_ms: float
+    wait_max_ms: float
+
+
+class DiagnosticsResponse(BaseModel):
+    caches: dict[str, CacheStats]
+    pool: PoolStats
@@ -1,24 +1,178 @@
-from rapidfuzz import fuzz
+import os
+import re
+from collections.abc import Collection, Sequence
+from typing import Any
 
-from models import Item
+import env  # noqa: F401 — loads .env before the settings below are read
 
 THRESHOLD = 60
+# Name, location and category: a hit on the item's name outranks the same
+# hit on where it is, which outranks its category
+WEIGHTS = (1.0, 0.9, 0.8)
 
+# rapidfuzz worker threads for large households; -1 uses every core.
+# Below PARALLEL_MIN_ITEMS the thread start-up costs more than it saves.
+WORKERS = int(os.getenv("SEARCH_WORKERS", "-1"))
+PARALLEL_MIN_ITEMS = 5000
+# Keeps a score like 0.9 * 70 from truncating to 62
+_EPSILON = 1e-9
+# rapidfuzz turns a fractional score_cutoff into an edit-distance bound and
+# can drop a row scoring right at it, so the cutoff only prunes rows at least
+# this far below the bar; the threshold and top-k below decide what's kept
+_CUTOFF_MARGIN = 1
 
-def fuzzy_search(items: list[Item], query: str) -> list[tuple[Item, int]]:
-    """Search items by name, location, and category. Returns (item, score) pairs sorted by score."""
-    results: list[tuple[Item, int]] = []
+# Stored alongside each item's name, location and category (see normalize)
+NORMALIZED_FIELDS = ("name_normalized", "location_normalized", "category_normalized")
+ARTICLES = frozenset({"a", "an", "the"})
+# "batteries" finds "battery"; changing this means backfilling with --all
+FOLD_PLURALS = os.getenv("SEARCH_FOLD_PLURALS", "1") == "1"
+# "band-aids" and "kid's" stay one word; other punctuation separates words
+_JOINERS = re.compile(r"(?<=\w)['\u2019-](?=\w)")
+_NON_WORD = re.compile(r"[\W_]+")
 
-    for item in items:
-        # Score against name, location, and category — take the best
-        scores = [
-            fuzz.token_set_ratio(query, item.name),
-            fuzz.token_set_ratio(query, item.location),
-            fuzz.token_set_ratio(query, item.category),
-        ]
-        best = int(max(scores))
-        if best >= THRESHOLD:
-            results.append((item, best))
 
-    results.sort(key=lambda r: r[1], reverse=True)
-    return results
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return word[:-2]
+    return word[:-1] if word.endswith("s") else word
+
+
+def normalize(text: str, fold_plurals: bool = FOLD_PLURALS) -> str:
+    """Lowercased words without punctuation or articles, deduplicated and sorted.
+
+    Items store this for each searched field when they're written, so a
+    search only normalizes the query.
+    """
+    text = _NON_WORD.sub(" ", _JOINERS.sub("", text.lower()))
+    words = {word for word in text.split() if word not in ARTICLES}
+    if fold_plurals:
+        words = {_singular(word) for word in words}
+    return " ".join(sorted(words))
+
+
+def sharing_words(query: str, column: Sequence[str]) -> list[int]:
+    """Rows of column with a word in common with query (both normalized)."""
+    words = set(query.split())
+    return [row for row, value in enumerate(column) if not words.isdisjoint(value.split())]
+
+
+def rank(
+    query: str,
+    columns: Sequence[Sequence[str]],
+    threshold: int = THRESHOLD,
+    limit: int | None = None,
+    weights: Sequence[float] | None = None,
+    sharing: Sequence[Collection[int]] | None = None,
+) -> list[tuple[int, int]]:
+    """Score a normalized query against parallel normalized columns and return (row, score) pairs.
+
+    A row's score is its best weighted column score truncated to int. Rows
+    below threshold are dropped and the rest sorted by score descending,
+    ties kept in row order.
+
+    Scores are token_set_ratio's, but only rows sharing a word with the query
+    (sharing, per column; found by scanning if not given) pay for it. With no
+    word in common, token_set_ratio of sorted, deduplicated words is plain
+    ratio, which a vectorized cdist call works out for the whole column.
+
+    With a limit, columns are scored heaviest first and each later one only
+    has to find rows that could still reach the current k-th best score:
+    score_cutoff lets rapidfuzz give up on the rest early, and a column whose
+    weight can't reach it is skipped altogether.
+    """
+    # ratio("", "") is 100: a query of only articles or punctuation matches nothing
+    if not query or not columns or not len(columns[0]) or (limit is not None and limit <= 0):
+        return []
+    # Imported here so the app starts without them; preload() brings them in early
+    import numpy as np
+    from rapidfuzz import fuzz, process
+
+    size = len(columns[0])
+    weights = weights or (1.0,) * len(columns)
+    workers = WORKERS if size >= PARALLEL_MIN_ITEMS else 1
+    best = np.zeros(size, dtype=np.int64)
+    sharing = sharing or [None] * len(columns)
+    for weight, column, shared in sorted(zip(weights, columns, sharing), key=lambda group: -group[0]):
+        bar = threshold
+        if limit is not None and limit < size:
+            bar = max(bar, int(np.partition(best, size - limit)[size - limit]))
+        if bar > int(100 * weight + _EPSILON):
+            break
+        cutoff = max(bar / weight - _CUTOFF_MARGIN, 0)
+        scores = process.cdist(
+            [query], column,
+            scorer=fuzz.ratio,
+            score_cutoff=cutoff,
+            dtype=np.float64,
+            workers=workers,
+        )[0]
+        shared = np.fromiter(sharing_words(query, column) if shared is None else shared, dtype=np.int64)
+        if len(shared):
+            scores[shared] = process.cdist(
+                [query], [column[row] for row in shared],
+                scorer=fuzz.token_set_ratio,
+                score_cutoff=cutoff,
+                dtype=np.float64,
+            )[0]
+        np.maximum(best, (scores * weight + _EPSILON).astype(np.int64), out=best)
+
+    rows = np.flatnonzero(best >= threshold)
+    scores = best[rows]
+
+    if limit is not None and limit < len(rows):
+        # Top-k without sorting every match: everything above the k-th score,
+        # then the earliest rows tied with it
+        kth = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[: limit - len(above)]
+        keep = np.sort(np.concatenate([above, ties]))
+        rows, scores = rows[keep], scores[keep]
+
+    order = np.argsort(-scores, kind="stable")
+    return list(zip(rows[order].tolist(), scores[order].tolist()))
+
+
+def merge_phonetic(
+    matches: list[tuple[int, int]], rows: Collection[int], threshold: int = THRESHOLD, limit: int | None = None
+) -> list[tuple[int, int]]:
+    """Add rows whose name sounds like the query (phonetic.py) to rank()'s matches.
+
+    A phonetic key ignores vowels, so short names collide ("hat" and
+    "hood"). Sounding alike only gets a row in at threshold, after every
+    match on spelling, and not at all when asked for a stricter threshold
+    than THRESHOLD; a row that also matched on spelling keeps its score.
+    The sound-alikes fill whatever room rank() left under the limit.
+    """
+    if threshold > THRESHOLD or (limit is not None and len(matches) >= limit):
+        return matches
+    matched = {row for row, _ in matches}
+    extra = [(row, threshold) for row in sorted(rows) if row not in matched]
+    merged = matches + extra
+    return merged if limit is None else merged[:limit]
+
+
+def preload() -> None:
+    """Import numpy and rapidfuzz, and warm up cdist, before the first search needs them."""
+    rank("warm", (["warm up"],))
+
+
+def fuzzy_search(
+    items: Sequence[Any],
+    query: str,
+    limit: int | None = None,
+    threshold: int = THRESHOLD,
+) -> list[tuple[Any, int]]:
+    """Search items by name, location, and category. Returns (item, score) pairs sorted by score.
+
+    The fields are normalized here; HouseholdIndex uses the stored ones.
+    """
+    columns = (
+        [normalize(item.name) for item in items],
+        [normalize(item.location) for item in items],
+        [normalize(item.category) for item in items],
+    )
+    return [(items[row], score) for row, score in rank(normalize(query), columns, threshold, limit, WEIGHTS)]
@@ -0,0 +1,201 @@
+"""Database-side text matching for item filters and search prefiltering.
+
+`%value%` ILIKE filters can't use a B-tree index, so each dialect gets a
+backend that can:
+
+* Postgres: pg_trgm GIN indexes on name/location/category serve ILIKE
+  directly, and trigram word similarity ranks fuzzy-search candidates.
+* SQLite: an FTS5 trigram table (items_fts) kept in sync with items by
+  triggers serves LIKE, and MATCH on the query's trigrams ranks candidates.
+  items_fts covers every household, so a value common across them ("garage")
+  is cheaper to find by scanning one household's rows; it's only used when
+  it matches fewer rows than the household has.
+
+Anything else falls back to plain ILIKE.
+"""
+import os
+import sqlite3
+
+from sqlalchemy import DDL, ColumnElement, Row, column, event, func, literal, or_, select, table
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+import env  # noqa: F401 — loads .env before the settings below are read
+from models import Item
+
+# Trigram indexes only help with patterns of three or more characters
+MIN_TRIGRAM_LENGTH = 3
+SEARCHED_COLUMNS = ("name", "location", "category")
+# Rows pulled into Python for rapidfuzz re-ranking when search can't use the in-memory index
+CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "500"))
+# items_fts takes about this many times longer to produce a matching row than a
+# scan of the household's items takes per row, measured with 200k items
+FTS_ROW_COST = 4
+# What candidates() returns: HouseholdIndex rows, stored search fields included
+CANDIDATE_COLUMNS = (
+    Item.id, Item.name, Item.location, Item.category,
+    Item.name_normalized, Item.location_normalized, Item.category_normalized, Item.name_phonetic,
+)
+
+
+def _sqlite_has_fts5_trigram() -> bool:
+    try:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+SQLITE_FTS = _sqlite_has_fts5_trigram()
+
+items_fts = table("items_fts", column("rowid"), *(column(name) for name in SEARCHED_COLUMNS))
+
+_FTS_COLUMNS = ", ".join(SEARCHED_COLUMNS)
+_NEW_VALUES = ", ".join(f"new.{name}" for name in SEARCHED_COLUMNS)
+_OLD_VALUES = ", ".join(f"old.{name}" for name in SEARCHED_COLUMNS)
+
+SQLITE_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    f"{_FTS_COLUMNS}, content='items', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN "
+    f"INSERT INTO items_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN "
+    f"INSERT INTO items_fts(items_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); END",
+    # Only edits to the indexed text touch items_fts, not e.g. backfilled search fields
+    f"CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF {_FTS_COLUMNS} ON items BEGIN "
+    f"INSERT INTO items_fts(items_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); "
+    f"INSERT INTO items_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+]
+SQLITE_FTS_REBUILD = "INSERT INTO items_fts(items_fts) VALUES ('rebuild')"
+
+POSTGRES_TRGM_DDL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS ix_items_{name}_trgm ON items USING gin ({name} gin_trgm_ops)"
+    for name in SEARCHED_COLUMNS
+]
+
+
+def _sqlite_fts_enabled(ddl, target, bind, **kw) -> bool:
+    return bind.dialect.name == "sqlite" and SQLITE_FTS
+
+
+# create_all/drop_all manage the dialect-specific objects alongside items
+for _statement in SQLITE_FTS_DDL:
+    event.listen(Item.__table__, "after_create", DDL(_statement).execute_if(callable_=_sqlite_fts_enabled))
+event.listen(
+    Item.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS items_fts").execute_if(callable_=_sqlite_fts_enabled),
+)
+for _statement in POSTGRES_TRGM_DDL:
+    event.listen(Item.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
+class SearchBackend:
+    """Plain ILIKE matching; the fallback for dialects without a text index."""
+
+    name = "like"
+
+    def contains(
+        self, db: Session, household_id: int, attribute: InstrumentedAttribute, value: str
+    ) -> ColumnElement[bool]:
+        """Case-insensitive substring filter on an Item column, for a query on one household's items."""
+        return attribute.ilike(f"%{value}%")
+
+    def candidates(self, db: Session, household_id: int, query: str, limit: int) -> list[Row]:
+        """Up to limit CANDIDATE_COLUMNS rows likely to fuzzy-match query."""
+        words = [word for word in query.split() if word]
+        if not words:
+            return []
+        return db.execute(
+            select(*CANDIDATE_COLUMNS)
+            .where(
+                Item.household_id == household_id,
+                or_(*(
+                    getattr(Item, name).ilike(f"%{word}%")
+                    for word in words for name in SEARCHED_COLUMNS
+                )),
+            )
+            .limit(limit)
+        ).all()
+
+
+class PostgresTrigramBackend(SearchBackend):
+    name = "pg_trgm"
+
+    # ILIKE is already served by the gin_trgm_ops indexes; only candidates differ
+
+    def candidates(self, db: Session, household_id: int, query: str, limit: int) -> list[Row]:
+        similarity = func.greatest(*(
+            func.word_similarity(literal(query), getattr(Item, name)) for name in SEARCHED_COLUMNS
+        ))
+        return db.execute(
+            select(*CANDIDATE_COLUMNS)
+            .where(
+                Item.household_id == household_id,
+                # <% is the index-assisted form of word_similarity >= threshold
+                or_(*(literal(query).op("<%")(getattr(Item, name)) for name in SEARCHED_COLUMNS)),
+            )
+            .order_by(similarity.desc())
+            .limit(limit)
+        ).all()
+
+
+class SQLiteFTSBackend(SearchBackend):
+    name = "fts5"
+
+    @staticmethod
+    def _selective(db: Session, household_id: int, condition: ColumnElement[bool]) -> bool:
+        """Whether items_fts finds condition's rows, across all households, faster than scanning household_id's.
+
+        items_fts is asked for no more rows than would settle it, so deciding
+        costs about as much as the household scan it may pick instead.
+        """
+        budget = db.scalar(select(func.count()).where(Item.household_id == household_id)) // FTS_ROW_COST
+        matches = db.scalar(
+            select(func.count()).select_from(select(items_fts.c.rowid).where(condition).limit(budget + 1).subquery())
+        )
+        return matches <= budget
+
+    def contains(
+        self, db: Session, household_id: int, attribute: InstrumentedAttribute, value: str
+    ) -> ColumnElement[bool]:
+        match = items_fts.c[attribute.key].like(f"%{value}%")
+        if len(value) < MIN_TRIGRAM_LENGTH or not self._selective(db, household_id, match):
+            return super().contains(db, household_id, attribute, value)
+        return Item.id.in_(select(items_fts.c.rowid).where(match))
+
+    def candidates(self, db: Session, household_id: int, query: str, limit: int) -> list[Row]:
+        trigrams = {
+            word[i:i + MIN_TRIGRAM_LENGTH]
+            for word in query.lower().split()
+            for i in range(len(word) - MIN_TRIGRAM_LENGTH + 1)
+        }
+        if not trigrams:
+            return super().candidates(db, household_id, query, limit)
+
+        match = column("items_fts").op("MATCH")(
+            " OR ".join('"' + trigram.replace('"', '""') + '"' for trigram in sorted(trigrams))
+        )
+        if not self._selective(db, household_id, match):
+            return super().candidates(db, household_id, query, limit)
+        ranked = select(items_fts.c.rowid, column("rank")).where(match).subquery()
+        return db.execute(
+            select(*CANDIDATE_COLUMNS)
+            .join(ranked, ranked.c.rowid == Item.id)
+            .where(Item.household_id == household_id)
+            .order_by(ranked.c.rank)
+            .limit(limit)
+        ).all()
+
+
+_BACKENDS = {
+    "postgresql": PostgresTrigramBackend(),
+    "sqlite": SQLiteFTSBackend() if SQLITE_FTS else SearchBackend(),
+}
+_DEFAULT = SearchBackend()
+
+
+def for_session(db: Session) -> SearchBackend:
+    return _BACKENDS.get(db.get_bind().dialect.name, _DEFAULT)
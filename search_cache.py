@@ -0,0 +1,195 @@
+"""Per-household cache of search results.
+
+Entries are keyed on the household's current version, which every write
+to the household bumps, so a result computed before a write is never
+served after it. The version is read before searching: a write that lands
+mid-search moves the household on and the result is filed under a version
+nobody will ask for again.
+
+By default entries live in an in-process LRU. Set SEARCH_CACHE_URL to a
+redis:// URL to share them between workers; anything with the redis.asyncio
+get/set/incr/scan_iter/delete API can stand in for Redis.
+"""
+import json
+import os
+from typing import Any, Protocol
+
+import env  # noqa: F401 — loads .env before the settings below are read
+from cache import LRUCache, Versions
+from search import normalize
+from search_index import IndexedItem
+
+CACHE_URL = os.getenv("SEARCH_CACHE_URL", "")
+CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+
+PREFIX = "search:"
+
+Results = list[tuple[IndexedItem, int]]
+
+
+class CacheBackend(Protocol):
+    # True when every worker sees the same entries
+    shared: bool
+
+    async def get(self, key: str) -> Results | None: ...
+    async def set(self, key: str, value: Results) -> None: ...
+    async def version(self, key: str) -> int: ...
+    async def bump(self, key: str) -> int: ...
+    async def clear(self) -> None: ...
+    def stats(self) -> dict[str, int | float]: ...
+
+
+class MemoryBackend:
+    """One process's LRU.
+
+    Versions are kept for as many households as there can be entries, so
+    those of households whose entries were evicted get dropped too, and
+    clear() moves every household on (see cache.Versions).
+    """
+
+    shared = False
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float | None = CACHE_TTL):
+        self._entries = LRUCache(maxsize, ttl=ttl)
+        self._versions = Versions(maxsize)
+
+    async def get(self, key: str) -> Results | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: Results) -> None:
+        self._entries.set(key, value)
+
+    async def version(self, key: str) -> int:
+        return self._versions.get(key)
+
+    async def bump(self, key: str) -> int:
+        return self._versions.bump(key)
+
+    async def clear(self) -> None:
+        self._versions.clear()
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return self._entries.stats()
+
+
+class RedisBackend:
+    """Entries shared through a Redis-compatible server, stored as JSON with a TTL.
+
+    Size and evictions are the server's business; only this process's
+    hits and misses are counted.
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, ttl: float | None = CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Results | None:
+        raw = await self.client.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [(IndexedItem(*item), score) for *item, score in json.loads(raw)]
+
+    async def set(self, key: str, value: Results) -> None:
+        payload = json.dumps([[*item, score] for item, score in value])
+        await self.client.set(key, payload, ex=int(self.ttl) if self.ttl else None)
+
+    async def version(self, key: str) -> int:
+        raw = await self.client.get(key)
+        return int(raw) if raw is not None else 0
+
+    async def bump(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    async def clear(self) -> None:
+        # Entries only: a deleted version would count up again from 0 and
+        # revive whatever was filed under the old numbers
+        keys = [key async for key in self.client.scan_iter(match=f"{PREFIX}[0-9]*")]
+        if keys:
+            await self.client.delete(*keys)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": 0,
+            "maxsize": 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": 0,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def normalize_query(query: str) -> str:
+    """The query as search scores it, so "The Drills" and "drill" share an entry."""
+    return normalize(query)
+
+
+class SearchCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _version_key(household_id: int) -> str:
+        return f"{PREFIX}v:{household_id}"
+
+    async def key(self, household_id: int, query: str, **options: Any) -> str:
+        """The entry key for a search as of the household's current version.
+
+        options are the scoring parameters (limit, threshold, ...) that shape
+        the result alongside the query.
+        """
+        version = await self.backend.version(self._version_key(household_id))
+        params = ",".join(f"{name}={options[name]}" for name in sorted(options))
+        # The query goes last since it may contain the separator
+        return f"{PREFIX}{household_id}:{version}:{params}:{normalize_query(query)}"
+
+    async def get(self, key: str) -> Results | None:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, results: list[tuple[Any, int]]) -> None:
+        await self.backend.set(key, [
+            (IndexedItem(item.id, item.name, item.location, item.category), score)
+            for item, score in results
+        ])
+
+    async def invalidate(self, household_id: int) -> None:
+        """Retire every cached search for the household; call after each write."""
+        await self.backend.bump(self._version_key(household_id))
+
+    async def invalidate_local(self, household_id: int) -> None:
+        """invalidate() for a write another worker made; shared backends already know."""
+        if not self.backend.shared:
+            await self.invalidate(household_id)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    async def clear_local(self) -> None:
+        if not self.backend.shared:
+            await self.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return self.backend.stats()
+
+
+def _backend_from_url(url: str) -> CacheBackend:
+    if not url:
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis.asyncio
+        except ImportError as exc:
+            raise RuntimeError("SEARCH_CACHE_URL needs the redis package: pip install redis") from exc
+        return RedisBackend(redis.asyncio.Redis.from_url(url))
+    raise ValueError(f"Unsupported SEARCH_CACHE_URL scheme: {url.split(':', 1)[0]}")
+
+
+search_cache = SearchCache(_backend_from_url(CACHE_URL))
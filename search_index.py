@@ -0,0 +1,217 @@
+import bisect
+import os
+import threading
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import env  # noqa: F401 — loads .env before the settings below are read
+import phonetic
+from cache import LRUCache, Versions
+from models import Item
+from search import NORMALIZED_FIELDS, THRESHOLD, WEIGHTS, merge_phonetic, normalize, rank
+from search_backend import CANDIDATE_COLUMNS
+
+MAX_HOUSEHOLDS = int(os.getenv("SEARCH_INDEX_MAX_HOUSEHOLDS", "1024"))
+IDLE_SECONDS = float(os.getenv("SEARCH_INDEX_IDLE_SECONDS", "900"))
+# Households bigger than this are searched through database prefiltering instead
+MAX_ITEMS = int(os.getenv("SEARCH_INDEX_MAX_ITEMS", "50000"))
+
+# Derived search columns crud.add_items writes with each item
+STORED_FIELDS = (*NORMALIZED_FIELDS, "name_phonetic")
+
+
+def stored_fields(name: str, location: str, category: str) -> dict[str, str]:
+    """The STORED_FIELDS values for an item."""
+    normalized = map(normalize, (name, location, category))
+    return dict(zip(STORED_FIELDS, (*normalized, phonetic.key(name))))
+
+
+class IndexedItem(NamedTuple):
+    id: int
+    name: str
+    location: str
+    category: str
+
+
+class HouseholdIndex:
+    """The searchable fields of one household's items, ordered by item id.
+
+    Alongside the entries it keeps one list per scored field holding its
+    normalized text, so a search hands rapidfuzz ready-made columns instead
+    of walking the items, and per field a map from each word to the ids of
+    the items using it, which tells rank() the rows token_set_ratio is for.
+    A map from each word code in the items' phonetic keys to their ids finds
+    the names sharing a sound with the query, one lookup per code.
+
+    Rows are (id, name, location, category), optionally followed by the
+    STORED_FIELDS; any missing are worked out here.
+    """
+
+    def __init__(self, rows=()):
+        self._lock = threading.Lock()
+        self._ids: list[int] = []
+        self._entries: list[IndexedItem] = []
+        self._columns: tuple[list[str], list[str], list[str]] = ([], [], [])
+        self._words: tuple[dict[str, set[int]], ...] = ({}, {}, {})
+        self._keys: list[str] = []
+        self._sounds: dict[str, set[int]] = {}
+        for row in sorted(rows, key=lambda r: r[0]):
+            self._append(IndexedItem(*row[:4]), row[4:])
+
+    def _append(self, entry: IndexedItem, stored=(), pos: int | None = None) -> None:
+        pos = len(self._ids) if pos is None else pos
+        *normalized, key = (*stored, None, None, None, None)[:4]
+        self._ids.insert(pos, entry.id)
+        self._entries.insert(pos, entry)
+        for column, words, value, text in zip(self._columns, self._words, entry[1:], normalized):
+            text = normalize(value) if text is None else text
+            column.insert(pos, text)
+            for word in text.split():
+                words.setdefault(word, set()).add(entry.id)
+        key = phonetic.key(entry.name) if key is None else key
+        self._keys.insert(pos, key)
+        for code in key.split():
+            self._sounds.setdefault(code, set()).add(entry.id)
+
+    def entries(self) -> list[IndexedItem]:
+        """Snapshot of the indexed items, safe to iterate while writes continue."""
+        with self._lock:
+            return list(self._entries)
+
+    def search(
+        self, query: str, limit: int | None = None, threshold: int = THRESHOLD
+    ) -> list[tuple[IndexedItem, int]]:
+        sounds_like = phonetic.key(query).split()
+        query = normalize(query)
+        with self._lock:
+            entries = list(self._entries)
+            columns = tuple(list(column) for column in self._columns)
+            sharing = [
+                [bisect.bisect_left(self._ids, item_id) for item_id in set().union(*(
+                    words.get(word, ()) for word in query.split()
+                ))]
+                for words in self._words
+            ]
+            sounding = [
+                bisect.bisect_left(self._ids, item_id)
+                for item_id in set().union(*(self._sounds.get(code, ()) for code in sounds_like))
+            ]
+        matches = rank(query, columns, threshold, limit, WEIGHTS, sharing)
+        matches = merge_phonetic(matches, sounding, threshold, limit)
+        return [(entries[row], score) for row, score in matches]
+
+    def add(self, item_id: int, name: str, location: str, category: str) -> None:
+        entry = IndexedItem(item_id, name, location, category)
+        with self._lock:
+            # New rows almost always have the highest id, so this is an append
+            pos = bisect.bisect_left(self._ids, item_id)
+            if pos < len(self._ids) and self._ids[pos] == item_id:
+                self._delete(pos)
+            self._append(entry, pos=pos)
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            pos = bisect.bisect_left(self._ids, item_id)
+            if pos < len(self._ids) and self._ids[pos] == item_id:
+                self._delete(pos)
+
+    def _delete(self, pos: int) -> None:
+        item_id = self._ids.pop(pos)
+        del self._entries[pos]
+        for column, words in zip(self._columns, self._words):
+            for word in column.pop(pos).split():
+                ids = words[word]
+                ids.discard(item_id)
+                if not ids:
+                    del words[word]
+        for code in self._keys.pop(pos).split():
+            ids = self._sounds[code]
+            ids.discard(item_id)
+            if not ids:
+                del self._sounds[code]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class SearchIndex:
+    """Per-household HouseholdIndex registry with LRU and idle eviction.
+
+    A household is loaded from the database on its first search and then kept
+    current by add_item/remove_item. Writes that land while a load is in
+    flight bump a version so the stale snapshot is used once, not cached.
+    Versions are kept for as many households as there can be indexes.
+    """
+
+    def __init__(
+        self,
+        max_households: int = MAX_HOUSEHOLDS,
+        idle_seconds: float = IDLE_SECONDS,
+        max_items: int = MAX_ITEMS,
+    ):
+        self.max_items = max_items
+        self._households = LRUCache(max_households, ttl=idle_seconds, sliding=True)
+        # Households found to be over max_items, rechecked once the entry expires
+        self._oversize = LRUCache(max_households, ttl=idle_seconds)
+        self._lock = threading.Lock()
+        self._versions = Versions(max_households)
+
+    def get(self, household_id: int) -> HouseholdIndex | None:
+        """Return the household's index if it is loaded."""
+        return self._households.get(household_id)
+
+    def is_oversize(self, household_id: int) -> bool:
+        return household_id in self._oversize
+
+    def load(self, db: Session, household_id: int) -> HouseholdIndex | None:
+        """Build the household's index from the database and cache it.
+
+        Returns None for households with more than max_items items.
+        """
+        version = self._versions.get(household_id)
+        rows = db.execute(
+            select(*CANDIDATE_COLUMNS)
+            .where(Item.household_id == household_id)
+            .limit(self.max_items + 1)
+        ).all()
+        if len(rows) > self.max_items:
+            self._oversize.set(household_id, True)
+            return None
+        index = HouseholdIndex(rows)
+
+        with self._lock:
+            if self._versions.get(household_id) == version:
+                self._households.set(household_id, index)
+        return index
+
+    def _touch(self, household_id: int) -> HouseholdIndex | None:
+        with self._lock:
+            self._versions.bump(household_id)
+        return self._households.peek(household_id)
+
+    def add_item(self, household_id: int, item_id: int, name: str, location: str, category: str) -> None:
+        index = self._touch(household_id)
+        if index is not None:
+            index.add(item_id, name, location, category)
+
+    def remove_item(self, household_id: int, item_id: int) -> None:
+        index = self._touch(household_id)
+        if index is not None:
+            index.remove(item_id)
+
+    def invalidate(self, household_id: int) -> None:
+        self._touch(household_id)
+        self._households.pop(household_id)
+
+    def clear(self) -> None:
+        self._versions.clear()
+        self._households.clear()
+        self._oversize.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return self._households.stats()
+
+
+household_index = SearchIndex()
@@ -0,0 +1,35 @@
+"""Run the API with one or more uvicorn worker processes.
+
+    WEB_CONCURRENCY=4 python serve.py
+
+Each worker has its own caches and connection pool (DB_POOL_SIZE is per
+worker). The workers keep their caches in step over the channel in
+invalidation.py. The schema is migrated once here, before the workers
+start, so they don't race each other to do it.
+"""
+import os
+
+import uvicorn
+
+import env  # noqa: F401 — loads .env before the settings below are read
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "10000"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def main() -> None:
+    from database import engine
+    from migrations import upgrade
+
+    upgrade(engine)
+    engine.dispose()
+    # Workers are fresh interpreters; they read WEB_CONCURRENCY from the
+    # environment when deciding whether to open an invalidation channel, and
+    # skip their own migration check since the schema is already current
+    os.environ["MIGRATIONS"] = "off"
+    uvicorn.run("main:create_app", factory=True, host=HOST, port=PORT, workers=WORKERS)
+
+
+if __name__ == "__main__":
+    main()
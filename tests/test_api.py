@@ -4,11 +4,21 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 # Force SQLite for tests
 os.environ["DATABASE_URL"] = "sqlite:///./test_homebox.db"
 
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 
-from database import Base, engine
+import bulk
+import crud
+import search_backend
+from auth import invalidate_member, token_cache
+from database import Base, SessionLocal, assert_max_queries, engine
 from main import app
+from migrations import schema_version
+from models import JOIN_CODE_ALPHABET, JOIN_CODE_LENGTH, Household, Item
+from search_cache import search_cache
+from search_index import household_index
 
 
 @pytest.fixture(autouse=True)
@@ -16,8 +26,12 @@ def reset_db():
     """Recreate all tables before each test."""
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    household_index.clear()
+    token_cache.clear()
+    asyncio.run(search_cache.clear())
     yield
     Base.metadata.drop_all(bind=engine)
+    schema_version.drop(bind=engine, checkfirst=True)
 
 
 client = TestClient(app)
@@ -29,6 +43,21 @@ class TestHealth:
         assert r.status_code == 200
         assert r.json()["status"] == "ok"
 
+    def test_diagnostics_pool(self):
+        client.get("/health")
+        pool = client.get("/diagnostics").json()["pool"]
+        assert pool["checked_out"] == 0
+        assert pool["wait_max_ms"] >= 0
+
+    def test_diagnostics_interpret_memo(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "the kettle is on the counter"}, headers=_auth(token))
+        before = client.get("/diagnostics").json()["caches"]["interpret"]
+        client.post("/items", json={"raw_input": "the kettle is on the counter"}, headers=_auth(token))
+        after = client.get("/diagnostics").json()["caches"]["interpret"]
+        assert after["hits"] == before["hits"] + 1
+        assert 0 < after["hit_rate"] <= 1
+
 
 class TestHouseholds:
     def test_create_household(self):
@@ -88,6 +117,38 @@ def _auth(token: str) -> dict:
     return {"Authorization": f"Bearer {token}"}
 
 
+class TestJoinCodes:
+    def test_codes_avoid_lookalikes(self):
+        code = client.post("/households", json={"household_name": "Home", "your_name": "Alice"}).json()["join_code"]
+        assert len(code) == JOIN_CODE_LENGTH
+        assert set(code) <= set(JOIN_CODE_ALPHABET)
+
+    def test_taken_code_is_drawn_again(self, monkeypatch):
+        taken = client.post("/households", json={"household_name": "Home", "your_name": "Alice"}).json()["join_code"]
+        codes = iter([taken, taken, "QQQQQQ"])
+        monkeypatch.setattr(crud, "_join_code", lambda: next(codes))
+        # Two skipped household INSERTs, then the household and member
+        with assert_max_queries(4):
+            r = client.post("/households", json={"household_name": "Other", "your_name": "Bob"})
+        assert r.json()["join_code"] == "QQQQQQ"
+        joined = client.post("/households/join", json={"join_code": taken, "your_name": "Carol"})
+        assert joined.json()["household_name"] == "Home"
+
+    def test_gives_up_when_every_code_is_taken(self, monkeypatch):
+        taken = client.post("/households", json={"household_name": "Home", "your_name": "Alice"}).json()["join_code"]
+        monkeypatch.setattr(crud, "_join_code", lambda: taken)
+        with SessionLocal() as db, pytest.raises(RuntimeError):
+            crud.create_household(db, "Other", "Bob")
+        with SessionLocal() as db:
+            assert db.query(Household).count() == 1
+
+    def test_join_code_as_dictated(self):
+        code = client.post("/households", json={"household_name": "Home", "your_name": "Alice"}).json()["join_code"]
+        spoken = " ".join(code.lower()[:3]) + "-" + code[3:]
+        r = client.post("/households/join", json={"join_code": spoken, "your_name": "Bob"})
+        assert r.json()["join_code"] == code
+
+
 class TestItems:
     def test_add_item(self):
         token = _create_and_get_token()
@@ -127,6 +188,82 @@ class TestItems:
         r = client.get("/items/search", params={"q": "garage"}, headers=_auth(token))
         assert len(r.json()["results"]) == 2
 
+    def test_search_limit_and_threshold(self):
+        token = _create_and_get_token()
+        for name in ("drill", "drill bits", "power drill", "cordless drill"):
+            client.post("/items", json={"raw_input": f"{name} in garage"}, headers=_auth(token))
+
+        r = client.post("/search", json={"query": "drill"}, headers=_auth(token))
+        assert len(r.json()["results"]) == 3
+        r = client.post("/search", json={"query": "drill", "limit": 1}, headers=_auth(token))
+        assert [result["name"] for result in r.json()["results"]] == ["drill"]
+        r = client.get("/items/search", params={"q": "drill", "limit": 2}, headers=_auth(token))
+        assert len(r.json()["results"]) == 2
+        r = client.get("/items/search", params={"q": "garage"}, headers=_auth(token))
+        assert {result["score"] for result in r.json()["results"]} == {90}
+        r = client.get("/items/search", params={"q": "garage", "threshold": 91}, headers=_auth(token))
+        assert r.json()["results"] == []
+
+    def test_search_ignores_case_articles_and_plurals(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "the Drill is in the Garage"}, headers=_auth(token))
+        r = client.get("/items/search", params={"q": "drills"}, headers=_auth(token))
+        assert [(result["name"], result["score"]) for result in r.json()["results"]] == [("Drill", 100)]
+        with SessionLocal() as db:
+            assert db.query(Item.name_normalized, Item.location_normalized).one() == ("drill", "garage")
+
+    def test_search_finds_misheard_names(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "wrench in garage"}, headers=_auth(token))
+        client.post("/items", json={"raw_input": "HDMI cable in tv stand"}, headers=_auth(token))
+        with SessionLocal() as db:
+            assert db.query(Item.name_phonetic).order_by(Item.id).all() == [("RNX",), ("KBL TM",)]
+
+        r = client.post("/search", json={"query": "ranch"}, headers=_auth(token))
+        assert r.json()["message"] == "wrench is in garage."
+        r = client.get("/items/search", params={"q": "h d m i cable"}, headers=_auth(token))
+        assert r.json()["results"][0]["name"] == "HDMI cable"
+
+    def test_large_household_search_finds_misheard_names(self, monkeypatch):
+        monkeypatch.setattr(household_index, "max_items", 1)
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "wrench in garage"}, headers=_auth(token))
+        client.post("/items", json={"raw_input": "hammer in shed"}, headers=_auth(token))
+
+        r = client.get("/items/search", params={"q": "ranch"}, headers=_auth(token))
+        assert [(result["name"], result["score"]) for result in r.json()["results"]] == [("wrench", 72)]
+
+        # Found by its key even when the text match misses it
+        monkeypatch.setattr(search_backend.SearchBackend, "candidates", lambda *args: [])
+        monkeypatch.setattr(search_backend, "for_session", lambda db: search_backend.SearchBackend())
+        with SessionLocal() as db:
+            assert [row.name for row in crud.search_candidates(db, 1, "ranch")] == ["wrench"]
+
+    def test_large_household_finds_names_by_one_misheard_word(self, monkeypatch):
+        monkeypatch.setattr(household_index, "max_items", 1)
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "socket wrench in garage"}, headers=_auth(token))
+        client.post("/items", json={"raw_input": "HDMI cable in tv stand"}, headers=_auth(token))
+        client.post("/items", json={"raw_input": "hammer in shed"}, headers=_auth(token))
+
+        monkeypatch.setattr(search_backend.SearchBackend, "candidates", lambda *args: [])
+        monkeypatch.setattr(search_backend, "for_session", lambda db: search_backend.SearchBackend())
+        with SessionLocal() as db:
+            assert [row.name for row in crud.search_candidates(db, 1, "ranch")] == ["socket wrench"]
+            assert [row.name for row in crud.search_candidates(db, 1, "h d m i")] == ["HDMI cable"]
+        r = client.get("/items/search", params={"q": "ranch"}, headers=_auth(token))
+        assert [result["name"] for result in r.json()["results"]] == ["socket wrench"]
+
+    def test_search_large_household_uses_candidates(self, monkeypatch):
+        monkeypatch.setattr(household_index, "max_items", 1)
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        client.post("/items", json={"raw_input": "hammer in shed"}, headers=_auth(token))
+
+        r = client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        assert r.json()["results"][0]["name"] == "drill"
+        assert household_index.is_oversize(1)
+
     def test_list_items(self):
         token = _create_and_get_token()
         client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
@@ -154,6 +291,36 @@ class TestItems:
         r = client.get("/items", params={"location": "garage"}, headers=_auth(token))
         assert r.json()["count"] == 2
 
+    def test_list_items_pagination(self):
+        token = _create_and_get_token()
+        for thing in ["drill", "hammer", "plates", "towels", "charger"]:
+            client.post("/items", json={"raw_input": f"{thing} in garage"}, headers=_auth(token))
+
+        names, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = client.get("/items", params=params, headers=_auth(token)).json()
+            names += [i["name"] for i in data["items"]]
+            pages += 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert pages == 3
+        assert names == ["charger", "towels", "plates", "hammer", "drill"]
+
+    def test_list_items_added_by(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        data = client.get("/items", headers=_auth(token)).json()
+        assert data["items"][0]["added_by"] == "Alice"
+        assert data["next_cursor"] is None
+
+    def test_list_items_bad_cursor(self):
+        token = _create_and_get_token()
+        r = client.get("/items", params={"cursor": "not-a-cursor"}, headers=_auth(token))
+        assert "error" in r.json()
+
     def test_delete_item(self):
         token = _create_and_get_token()
         r1 = client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
@@ -166,6 +333,16 @@ class TestItems:
         r3 = client.get("/items", headers=_auth(token))
         assert r3.json()["count"] == 0
 
+    def test_search_after_delete(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        r1 = client.post("/items", json={"raw_input": "hammer in garage"}, headers=_auth(token))
+        assert len(client.get("/items/search", params={"q": "garage"}, headers=_auth(token)).json()["results"]) == 2
+
+        client.delete(f"/items/{r1.json()['item']['id']}", headers=_auth(token))
+        r2 = client.get("/items/search", params={"q": "garage"}, headers=_auth(token))
+        assert [i["name"] for i in r2.json()["results"]] == ["drill"]
+
     def test_delete_item_not_found(self):
         token = _create_and_get_token()
         r = client.delete("/items/9999", headers=_auth(token))
@@ -223,3 +400,274 @@ class TestMultiUser:
         # Each only sees their own
         assert client.get("/items", headers=_auth(alice_token)).json()["count"] == 1
         assert client.get("/items", headers=_auth(carol_token)).json()["count"] == 1
+
+
+class TestTokenCache:
+    def test_repeat_requests_hit_cache(self):
+        token = _create_and_get_token()
+        client.get("/items", headers=_auth(token))
+        before = client.get("/diagnostics").json()["caches"]["auth_tokens"]
+        client.get("/items", headers=_auth(token))
+        after = client.get("/diagnostics").json()["caches"]["auth_tokens"]
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"]
+
+    def test_unknown_token_not_cached(self):
+        client.get("/items", headers=_auth("nope"))
+        assert "nope" not in token_cache
+
+    def test_invalidate_member(self):
+        token = _create_and_get_token()
+        client.get("/items", headers=_auth(token))
+        assert token in token_cache
+        invalidate_member(token_cache.get(token).id)
+        assert token not in token_cache
+
+
+class TestSearchCache:
+    def test_repeat_search_hits_cache(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        client.get("/items/search", params={"q": "drill", "limit": 3}, headers=_auth(token))
+        before = client.get("/diagnostics").json()["caches"]["search_results"]
+        r = client.post("/search", json={"query": " drill "}, headers=_auth(token))
+        after = client.get("/diagnostics").json()["caches"]["search_results"]
+        assert r.json()["results"][0]["name"] == "drill"
+        assert after["hits"] == before["hits"] + 1
+
+    def test_limit_and_threshold_are_part_of_the_key(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        before = client.get("/diagnostics").json()["caches"]["search_results"]
+        client.get("/items/search", params={"q": "drill", "limit": 1}, headers=_auth(token))
+        client.get("/items/search", params={"q": "drill", "threshold": 90}, headers=_auth(token))
+        after = client.get("/diagnostics").json()["caches"]["search_results"]
+        assert after["hits"] == before["hits"]
+
+    def test_add_invalidates(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        assert len(client.get("/items/search", params={"q": "drill"}, headers=_auth(token)).json()["results"]) == 1
+        client.post("/items", json={"raw_input": "drill bits in garage"}, headers=_auth(token))
+        assert len(client.get("/items/search", params={"q": "drill"}, headers=_auth(token)).json()["results"]) == 2
+
+
+class TestTiming:
+    def test_server_timing_header(self):
+        token = _create_and_get_token()
+        client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        r = client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        phases = {entry.split(";")[0] for entry in r.headers["server-timing"].split(", ")}
+        assert {"auth", "db", "search", "handler", "serialize", "total"} <= phases
+
+    def test_metrics_per_route_and_phase(self):
+        token = _create_and_get_token()
+        client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        r = client.get("/metrics")
+        assert r.headers["content-type"].startswith("text/plain")
+        assert 'homebox_request_duration_seconds_count{method="GET",route="/items/search",status="200"}' in r.text
+        assert 'homebox_phase_duration_seconds_bucket{method="GET",route="/items/search",phase="search",le="+Inf"}' in r.text
+
+
+class TestQueryCounts:
+    """Upper bounds on the statements each endpoint runs, so N+1s show up as failures."""
+
+    def _household(self, members: int = 3) -> list[str]:
+        r = client.post("/households", json={"household_name": "Test Home", "your_name": "Alice"})
+        tokens = [r.json()["token"]]
+        for n in range(members - 1):
+            joined = client.post("/households/join", json={"join_code": r.json()["join_code"], "your_name": f"M{n}"})
+            tokens.append(joined.json()["token"])
+        for n, token in enumerate(tokens * 3):
+            client.post("/items", json={"raw_input": f"thing {n} in garage"}, headers=_auth(token))
+        return tokens
+
+    def test_create_household(self):
+        # One on PostgreSQL, where the member's INSERT reads the household's from a CTE
+        with assert_max_queries(2):
+            r = client.post("/households", json={"household_name": "Test Home", "your_name": "Alice"})
+        assert r.json()["token"]
+
+    def test_join_household(self):
+        code = client.post("/households", json={"household_name": "Test Home", "your_name": "Alice"}).json()["join_code"]
+        with assert_max_queries(2):
+            r = client.post("/households/join", json={"join_code": code, "your_name": "Bob"})
+        assert r.json()["household_name"] == "Test Home"
+
+    def test_add_item(self):
+        token = self._household()[0]
+        with assert_max_queries(1):
+            r = client.post("/items", json={"raw_input": "drill in garage"}, headers=_auth(token))
+        assert r.json()["item"]["created_at"]
+
+    def test_list_items_from_many_members(self):
+        token = self._household()[0]
+        with assert_max_queries(1):
+            r = client.get("/items", headers=_auth(token))
+        assert len({item["added_by"] for item in r.json()["items"]}) == 3
+
+    def test_search(self):
+        token = self._household()[0]
+        with assert_max_queries(1):
+            client.get("/items/search", params={"q": "thing"}, headers=_auth(token))
+        with assert_max_queries(0):
+            client.post("/search", json={"query": "thing"}, headers=_auth(token))
+
+    def test_delete_item(self):
+        token = self._household()[0]
+        item_id = client.get("/items", headers=_auth(token)).json()["items"][0]["id"]
+        with assert_max_queries(1):
+            r = client.delete(f"/items/{item_id}", headers=_auth(token))
+        assert r.json()["message"].startswith("Deleted")
+
+
+class TestExportImport:
+    def _seed(self) -> str:
+        token = _create_and_get_token()
+        client.post("/items/bulk", json={"lines": ["drill in garage", "plates, kitchen", "towels in the linen closet"]}, headers=_auth(token))
+        return token
+
+    def test_export_ndjson(self):
+        import json
+
+        token = self._seed()
+        r = client.get("/households/export", headers=_auth(token))
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in r.text.splitlines()]
+        assert [record["name"] for record in records] == ["drill", "plates", "towels"]
+        assert records[0]["category"] == "Tools"
+        assert records[0]["added_by"] == "Alice"
+
+    def test_export_empty_csv_has_header(self):
+        token = _create_and_get_token()
+        r = client.get("/households/export", params={"format": "csv"}, headers=_auth(token))
+        assert r.text == "name,location,category,raw_input,added_by,created_at\n"
+
+    @pytest.mark.parametrize("format, content_type", [("ndjson", "application/x-ndjson"), ("csv", "text/csv")])
+    def test_round_trip(self, format, content_type):
+        exported = client.get("/households/export", params={"format": format}, headers=_auth(self._seed())).content
+        token = _create_and_get_token()
+        r = client.post("/households/import", content=exported, headers={**_auth(token), "Content-Type": content_type})
+        assert r.json()["added"] == 3
+        reexported = client.get("/households/export", params={"format": format}, headers=_auth(token)).content
+        assert reexported == exported
+
+    def test_import_streams_in_batches(self, monkeypatch):
+        import bulk
+
+        monkeypatch.setattr(bulk, "BATCH_SIZE", 2)
+        token = _create_and_get_token()
+        body = (f"thing {n} in garage\n".encode() for n in range(5))
+        r = client.post("/households/import", content=body, headers={**_auth(token), "Content-Type": "text/plain"})
+        assert r.json()["added"] == 5
+        assert client.get("/items", headers=_auth(token)).json()["count"] == 5
+
+    def test_import_reports_bad_lines_and_continues(self):
+        token = _create_and_get_token()
+        body = '{"raw_input": "drill in garage"}\nnot json\n{"name": "hammer", "location": "shed", "created_at": "yesterday"}\n"hello"\n'
+        r = client.post("/households/import", content=body, headers={**_auth(token), "Content-Type": "application/x-ndjson"})
+        data = r.json()
+        assert (data["added"], data["failed"]) == (1, 3)
+        assert [error["line"] for error in data["errors"]] == [2, 3, 4]
+
+    def test_import_csv_quoted_newline(self):
+        token = _create_and_get_token()
+        body = 'name,location,category\n"drill\nbits",garage,Hardware\nhammer,shed,\n'
+        data = client.post("/households/import", content=body, headers={**_auth(token), "Content-Type": "text/csv"}).json()
+        assert data["added"] == 2
+        items = {item["name"]: item for item in client.get("/items", headers=_auth(token)).json()["items"]}
+        assert items["drill\nbits"]["category"] == "Hardware"
+        assert items["hammer"]["category"] == "Tools"
+
+    def test_import_csv_inch_mark(self):
+        token = _create_and_get_token()
+        body = 'name,location\n6" nails,garage\n' + "".join(f"thing {i},shed\n" for i in range(999))
+        data = client.post("/households/import", content=body, headers={**_auth(token), "Content-Type": "text/csv"}).json()
+        assert (data["added"], data["failed"]) == (1000, 0)
+        assert client.get("/items/search", params={"q": "nails"}, headers=_auth(token)).json()["results"][0]["name"] == '6" nails'
+
+    def test_import_unclosed_quote_is_one_bad_line(self, monkeypatch):
+        monkeypatch.setattr(bulk, "MAX_LINE_LENGTH", 100)
+        token = _create_and_get_token()
+        body = 'name,location\n"drill,garage\n' + "".join(f"thing {i},shed\n" for i in range(20))
+        data = client.post("/households/import", content=body, headers={**_auth(token), "Content-Type": "text/csv"}).json()
+        assert data["failed"] == 1
+        assert data["errors"][0]["line"] == 2
+        assert data["added"] > 0
+
+    def test_import_bad_header(self):
+        token = _create_and_get_token()
+        r = client.post("/households/import", content="thing\ndrill\n", headers={**_auth(token), "Content-Type": "text/csv"})
+        assert "error" in r.json()
+
+    def test_export_no_auth(self):
+        assert "error" in client.get("/households/export").json()
+
+
+class TestBulkAdd:
+    def test_json_lines(self):
+        token = _create_and_get_token()
+        r = client.post("/items/bulk", json={"lines": ["drill in garage", "hello", "plates, kitchen"]}, headers=_auth(token))
+        data = r.json()
+        assert data["added"] == 2
+        assert data["failed"] == 1
+        assert [res["line"] for res in data["results"]] == [1, 2, 3]
+        assert data["results"][0]["item"]["category"] == "Tools"
+        assert "error" in data["results"][1]
+        assert client.get("/items", headers=_auth(token)).json()["count"] == 2
+
+    def test_bulk_items_are_searchable(self):
+        token = _create_and_get_token()
+        client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        client.post("/items/bulk", json={"lines": ["drill in garage"]}, headers=_auth(token))
+        r = client.get("/items/search", params={"q": "drill"}, headers=_auth(token))
+        assert r.json()["results"][0]["name"] == "drill"
+
+    def test_csv_upload(self):
+        token = _create_and_get_token()
+        body = 'name,location\n"drill, bits",garage\nhammer,shed\n,attic\n'
+        r = client.post("/items/bulk", content=body, headers={**_auth(token), "Content-Type": "text/csv"})
+        data = r.json()
+        assert data["added"] == 2
+        assert data["results"][0]["item"]["name"] == "drill, bits"
+        assert data["results"][2]["line"] == 4
+        assert "error" in data["results"][2]
+
+    def test_csv_inch_mark(self):
+        token = _create_and_get_token()
+        body = 'name,location\n6" nails,garage\nhammer,shed\n'
+        data = client.post("/items/bulk", content=body, headers={**_auth(token), "Content-Type": "text/csv"}).json()
+        assert data["added"] == 2
+        assert data["results"][0]["item"]["name"] == '6" nails'
+
+    def test_csv_needs_known_columns(self):
+        token = _create_and_get_token()
+        r = client.post("/items/bulk", content="thing\ndrill\n", headers={**_auth(token), "Content-Type": "text/csv"})
+        assert "error" in r.json()
+
+    def test_ndjson_upload(self):
+        token = _create_and_get_token()
+        body = '"drill in garage"\n\n{"raw_input": "towels are in the linen closet"}\n'
+        r = client.post("/items/bulk", content=body, headers={**_auth(token), "Content-Type": "application/x-ndjson"})
+        data = r.json()
+        assert data["added"] == 2
+        assert [res["line"] for res in data["results"]] == [1, 3]
+
+    def test_stream_progress(self):
+        import json
+
+        token = _create_and_get_token()
+        r = client.post(
+            "/items/bulk", params={"stream": "true"},
+            json={"lines": ["drill in garage", "hello"]}, headers=_auth(token),
+        )
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in r.text.splitlines()]
+        assert records[0]["item"]["name"] == "drill"
+        assert records[-1] == {"processed": 2, "total": 2, "added": 1, "failed": 1}
+        assert client.get("/items", headers=_auth(token)).json()["count"] == 1
+
+    def test_bulk_no_auth(self):
+        r = client.post("/items/bulk", json={"lines": ["drill in garage"]})
+        assert "error" in r.json()
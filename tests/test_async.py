@@ -0,0 +1,31 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import importlib.util
+import subprocess
+
+import pytest
+
+from database import DATABASE_ASYNC, async_url
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_async_url_sqlite():
+    assert async_url("sqlite:///./homebox.db") == "sqlite+aiosqlite:///./homebox.db"
+
+
+def test_async_url_postgres_sslmode():
+    url = async_url("postgresql://user:pw@ep-example.neon.tech/homebox?sslmode=require")
+    assert url == "postgresql+asyncpg://user:pw@ep-example.neon.tech/homebox?ssl=require"
+
+
+@pytest.mark.skipif(DATABASE_ASYNC, reason="already running in async mode")
+@pytest.mark.skipif(importlib.util.find_spec("aiosqlite") is None, reason="aiosqlite not installed")
+def test_api_suite_in_async_mode():
+    env = {**os.environ, "DATABASE_ASYNC": "1"}
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "tests/test_api.py"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout[-3000:]
@@ -1,7 +1,8 @@
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from categories import categorize
+import categories
+from categories import CATEGORY_KEYWORDS, categorize, categorize_many
 
 
 def test_tools():
@@ -51,3 +52,52 @@ def test_clothing():
 def test_other():
     assert categorize("random thing") == "Other"
     assert categorize("widget") == "Other"
+
+
+def _reference(item_name: str) -> str:
+    """The original nested loop, kept to pin the compiled matcher's answers."""
+    lower = item_name.lower()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in lower:
+                return category
+    return "Other"
+
+
+ALL_KEYWORDS = [keyword for keywords in CATEGORY_KEYWORDS.values() for keyword in keywords]
+
+
+def test_first_category_wins():
+    assert categorize("pot") == "Kitchen"
+    assert categorize("flower pot") == "Kitchen"
+
+
+def test_every_keyword_matches_reference():
+    for keyword in ALL_KEYWORDS:
+        for name in (keyword, keyword.upper(), f"old {keyword}s", f"x{keyword}y"):
+            assert categorize(name) == _reference(name), name
+
+
+def test_keyword_pairs_match_reference():
+    # Later-category keywords first, so the earliest position isn't the answer
+    for first in ALL_KEYWORDS:
+        for second in ALL_KEYWORDS[::7]:
+            for name in (f"{first} {second}", f"{first}{second}"):
+                assert categorize(name) == _reference(name), name
+
+
+def test_categorize_many():
+    names = ["hammer", "random thing", "hammer", "garden hose"]
+    assert categorize_many(names) == ["Tools", "Other", "Tools", "Outdoor"]
+    assert categorize_many([]) == []
+
+
+def test_reload(monkeypatch):
+    monkeypatch.setitem(CATEGORY_KEYWORDS, "Books", ["novel"])
+    categories.reload()
+    try:
+        assert categorize("paperback novel") == "Books"
+    finally:
+        monkeypatch.undo()
+        categories.reload()
+    assert categorize("paperback novel") == "Other"
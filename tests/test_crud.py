@@ -0,0 +1,51 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy.dialects import postgresql
+
+import crud
+
+
+class RecordingSession:
+    """Stands in for a PostgreSQL session: records statements, answers like a found row."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def get_bind(self):
+        return self
+
+    @property
+    def dialect(self):
+        return postgresql.dialect()
+
+    def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return self
+
+    def scalar(self):
+        return "Test Home"
+
+    def first(self):
+        return (1,)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_create_household_is_one_statement_on_postgres():
+    db = RecordingSession()
+    membership = crud.create_household(db, "Test Home", "Alice")
+    assert len(db.statements) == 1 and db.commits == 1
+    assert db.statements[0].startswith("WITH new_household AS")
+    assert "ON CONFLICT (join_code) DO NOTHING" in db.statements[0]
+    assert len(membership.join_code) == 6 and membership.token
+
+
+def test_join_household_is_one_statement_on_postgres():
+    db = RecordingSession()
+    membership = crud.join_household(db, "ABC123", "Bob")
+    assert len(db.statements) == 1 and db.commits == 1
+    assert "INSERT INTO members" in db.statements[0]
+    assert membership.household_name == "Test Home"
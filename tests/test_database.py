@@ -0,0 +1,84 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Force SQLite for tests
+os.environ["DATABASE_URL"] = "sqlite:///./test_homebox.db"
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+import database
+from database import _pool_args, _sqlite_pragmas, pool_stats, warm_pool
+
+
+def test_sqlite_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    event.listen(engine, "connect", _sqlite_pragmas)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # 1 = NORMAL
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+
+def test_pool_args_from_settings():
+    args = _pool_args("postgresql://u:p@host/db")
+    assert args["pool_size"] == database.POOL_SIZE
+    assert args["max_overflow"] == database.MAX_OVERFLOW
+    assert args["pool_pre_ping"] is True
+
+
+def test_pool_args_memory_sqlite():
+    assert _pool_args("sqlite://") == {}
+
+
+def test_null_pool(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL", "null")
+    args = _pool_args("postgresql://u:p@host/db")
+    assert args["poolclass"].__name__ == "NullPool"
+
+
+@pytest.mark.skipif(database.DB_POOL == "null", reason="no pool to warm")
+def test_warm_pool_fills_pool():
+    database.engine.dispose()
+    assert warm_pool(3) == 3
+    stats = pool_stats(database.engine)
+    assert stats["checked_in"] == 3
+    assert stats["checked_out"] == 0
+    assert stats["waits"] >= 3
+
+
+def test_statement_shape_collapses_in_lists():
+    a = database.statement_shape("SELECT * FROM members\n WHERE id IN (?, ?, ?)")
+    b = database.statement_shape("SELECT * FROM members WHERE id IN (?, ?)")
+    assert a == b == "SELECT * FROM members WHERE id IN (...)"
+
+
+def test_profile_queries_flags_repeats(caplog):
+    with database.engine.connect() as conn:
+        with database.profile_queries("loop") as log:
+            for n in range(database.N_PLUS_ONE_THRESHOLD):
+                conn.execute(text("SELECT :n"), {"n": n})
+            conn.execute(text("SELECT 1, 2"))
+    assert log.count == database.N_PLUS_ONE_THRESHOLD + 1
+    assert log.repeated() == [("SELECT ?", database.N_PLUS_ONE_THRESHOLD)]
+    assert "Possible N+1 in loop" in caplog.text
+
+
+def test_slow_query_logged_with_parameters(monkeypatch, caplog):
+    monkeypatch.setattr(database, "SLOW_QUERY_MS", 0)
+    with database.profile_queries():
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT :marker"), {"marker": "needle"})
+    assert "Slow query" in caplog.text
+    assert "needle" in caplog.text
+
+
+def test_assert_max_queries():
+    with database.assert_max_queries(1):
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    with pytest.raises(AssertionError, match="2 queries, expected at most 1"):
+        with database.assert_max_queries(1):
+            with database.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
@@ -0,0 +1,72 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import re
+
+import pytest
+
+import categories
+import interpret
+import nlp
+from categories import CATEGORY_KEYWORDS
+from interpret import Interpretation, interpret_many, memo
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    memo.clear()
+    yield
+    memo.clear()
+
+
+def test_interprets():
+    assert interpret.interpret("the drill is in the garage") == Interpretation("drill", "garage", "Tools")
+    assert interpret.interpret("hello world") is None
+
+
+def test_repeats_hit_memo():
+    interpret.interpret("the drill is in the garage")
+    before = memo.stats()
+    interpret.interpret("the drill is in the garage")
+    # Same text once cleaned
+    interpret.interpret("  um the drill is in the garage.")
+    after = memo.stats()
+    assert after["hits"] == before["hits"] + 2
+    assert after["size"] == 1
+
+
+def test_failures_are_memoized():
+    interpret.interpret("hello world")
+    before = memo.stats()
+    interpret.interpret("hello world")
+    assert memo.stats()["hits"] == before["hits"] + 1
+
+
+def test_many_matches_single():
+    lines = ["drill in garage", "hello", "drill in garage", "plates, kitchen"]
+    assert interpret_many(lines) == [interpret.interpret(line) for line in lines]
+
+
+def test_category_reload_invalidates(monkeypatch):
+    assert interpret.interpret("novel on the shelf").category == "Other"
+    monkeypatch.setitem(CATEGORY_KEYWORDS, "Books", ["novel"])
+    categories.reload()
+    try:
+        assert interpret.interpret("novel on the shelf").category == "Books"
+        assert len(memo) == 1
+    finally:
+        monkeypatch.undo()
+        categories.reload()
+    assert interpret.interpret("novel on the shelf").category == "Other"
+
+
+def test_pattern_reload_invalidates(monkeypatch):
+    assert interpret.interpret("drill @ garage") is None
+    monkeypatch.setattr(nlp, "PATTERNS", nlp.PATTERNS + [(re.compile(r"^(.+?)\s*@\s*(.+)$"), (1, 2), "@")])
+    nlp.reload()
+    try:
+        assert interpret.interpret("drill @ garage") == Interpretation("drill", "garage", "Tools")
+    finally:
+        monkeypatch.undo()
+        nlp.reload()
+    assert interpret.interpret("drill @ garage") is None
@@ -0,0 +1,75 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import socket
+
+import invalidation
+from invalidation import ITEMS, PostgresChannel, SocketChannel
+from search_cache import search_cache
+from search_index import HouseholdIndex, household_index
+
+
+async def _exchange(directory, events):
+    received = {"a": [], "b": []}
+
+    def collector(name):
+        async def handler(kind, key):
+            received[name].append((kind, key))
+        return handler
+
+    a, b = SocketChannel(str(directory), name="a"), SocketChannel(str(directory), name="b")
+    await a.start(collector("a"))
+    await b.start(collector("b"))
+    try:
+        for kind, key in events:
+            await a.publish(kind, key)
+        for _ in range(50):
+            if len(received["b"]) == len(events):
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await a.stop()
+        await b.stop()
+    return received
+
+
+def test_socket_channel_reaches_peers_only(tmp_path):
+    received = asyncio.run(_exchange(tmp_path, [(ITEMS, 1), (ITEMS, 2)]))
+    assert received["b"] == [(ITEMS, 1), (ITEMS, 2)]
+    assert received["a"] == []
+    assert not list(tmp_path.glob("*.sock"))
+
+
+def test_socket_channel_removes_dead_peers(tmp_path):
+    dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    dead.bind(str(tmp_path / "12345.sock"))
+    dead.close()
+    asyncio.run(_exchange(tmp_path, [(ITEMS, 1)]))
+    assert not (tmp_path / "12345.sock").exists()
+
+
+def test_apply_drops_household_caches():
+    household_index.clear()
+    household_index._households.set(7, HouseholdIndex([(1, "drill", "garage", "Tools")]))
+    household_index._households.set(8, HouseholdIndex())
+
+    async def scenario():
+        before = await search_cache.key(7, "drill")
+        await invalidation.apply(ITEMS, 7)
+        return before, await search_cache.key(7, "drill")
+
+    before, after = asyncio.run(scenario())
+    assert household_index.get(7) is None
+    assert household_index.get(8) is not None
+    assert before != after
+    household_index.clear()
+
+
+def test_postgres_dsn_drops_driver():
+    channel = PostgresChannel("postgresql+psycopg2://u:p@db.example/homebox?sslmode=require")
+    assert channel.dsn == "postgresql://u:p@db.example/homebox?sslmode=require"
+
+
+def test_single_worker_has_no_channel():
+    assert invalidation.WORKERS > 1 or invalidation.channel is None
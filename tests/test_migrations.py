@@ -0,0 +1,157 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, insert, select, text, update
+
+import search_backend
+from database import Base
+from migrations import MIGRATIONS, backfill_search_fields, current_version, upgrade
+from models import Household, Item, Member
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_fresh_database(engine):
+    assert upgrade(engine) == [number for number, _, _ in MIGRATIONS]
+    assert {"households", "members", "items"} <= set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        assert current_version(conn) == MIGRATIONS[-1][0]
+
+
+def test_upgrade_is_idempotent(engine):
+    upgrade(engine)
+    assert upgrade(engine) == []
+
+
+def test_adds_indexes_to_legacy_schema(engine):
+    # Databases created by the old bare create_all have the tables but not the indexes
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in ("ix_items_household_created", "ix_items_household_category", "ix_members_household_id"):
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    upgrade(engine)
+    assert {"ix_items_household_created", "ix_items_household_category"} <= _index_names(engine, "items")
+    assert "ix_members_household_id" in _index_names(engine, "members")
+
+
+def _seed(engine, households=20, items_per=50):
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        for h in range(1, households + 1):
+            conn.execute(insert(Household).values(id=h, name=f"home {h}", join_code=f"C{h:05d}"))
+            conn.execute(insert(Member).values(id=h, household_id=h, name="m", token=f"t{h}"))
+            conn.execute(insert(Item), [
+                {
+                    "household_id": h, "added_by": h, "name": f"item {i}", "location": "garage",
+                    "category": "Tools" if i % 2 else "Kitchen", "raw_input": "x",
+                    "created_at": now - timedelta(minutes=i), "updated_at": now,
+                }
+                for i in range(items_per)
+            ])
+        conn.execute(text("ANALYZE"))
+
+
+def _plan(engine, sql):
+    with engine.connect() as conn:
+        return " | ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def test_list_query_uses_household_created_index(engine):
+    upgrade(engine)
+    _seed(engine)
+    plan = _plan(engine, "SELECT id FROM items WHERE household_id = 3 ORDER BY created_at DESC")
+    assert "ix_items_household_created" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_category_query_uses_household_category_index(engine):
+    upgrade(engine)
+    _seed(engine)
+    plan = _plan(engine, "SELECT id FROM items WHERE household_id = 3 AND category = 'Tools'")
+    assert "ix_items_household_category" in plan
+
+
+def test_member_lookup_by_household_uses_index(engine):
+    upgrade(engine)
+    _seed(engine)
+    plan = _plan(engine, "SELECT id FROM members WHERE household_id = 3")
+    assert "ix_members_household_id" in plan
+
+
+def test_adds_normalized_columns_to_legacy_schema(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in ("name_normalized", "location_normalized", "category_normalized"):
+            conn.execute(text(f"ALTER TABLE items DROP COLUMN {name}"))
+
+    upgrade(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("items")}
+    assert {"name_normalized", "location_normalized", "category_normalized"} <= columns
+
+
+def test_adds_phonetic_column_and_index(engine):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_items_household_name_phonetic"))
+        conn.execute(text("ALTER TABLE items DROP COLUMN name_phonetic"))
+
+    upgrade(engine)
+    assert "name_phonetic" in {column["name"] for column in inspect(engine).get_columns("items")}
+    _seed(engine)
+    plan = _plan(engine, "SELECT id FROM items WHERE household_id = 3 AND name_phonetic = 'RNX'")
+    assert "ix_items_household_name_phonetic" in plan
+
+
+def test_backfill_search_fields(engine):
+    upgrade(engine)
+    _seed(engine, households=2, items_per=5)
+    with engine.begin() as conn:
+        conn.execute(update(Item).where(Item.id == 3).values(
+            name="The Drills", name_normalized="stale", location_normalized="stale", category_normalized="stale",
+            name_phonetic="stale",
+        ))
+
+    assert backfill_search_fields(engine, batch_size=3) == 9
+    assert backfill_search_fields(engine) == 0
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(Item.id, Item.name_normalized, Item.category_normalized, Item.name_phonetic).order_by(Item.id)
+        ).all()
+    assert rows[0][1:] == ("0 item", "kitchen", "0 ITM")
+    # Only rows with a NULL are filled in, unless all rows are asked for
+    assert rows[2][1] == "stale"
+    assert backfill_search_fields(engine, all_rows=True) == 10
+    with engine.connect() as conn:
+        assert conn.execute(select(Item.name_normalized).where(Item.id == 3)).scalar() == "drill"
+
+
+@pytest.mark.skipif(not search_backend.SQLITE_FTS, reason="SQLite built without FTS5 trigram")
+def test_fts_update_trigger_replaced(engine):
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER items_fts_au"))
+        conn.execute(text(
+            "CREATE TRIGGER items_fts_au AFTER UPDATE ON items BEGIN "
+            "INSERT INTO items_fts(items_fts, rowid, name, location, category) "
+            "VALUES ('delete', old.id, old.name, old.location, old.category); "
+            "INSERT INTO items_fts(rowid, name, location, category) VALUES (new.id, new.name, new.location, new.category); END"
+        ))
+        conn.execute(text("DELETE FROM schema_version WHERE version = 6"))
+
+    assert upgrade(engine) == [6]
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'items_fts_au'")).scalar()
+    assert "AFTER UPDATE OF name, location, category ON items" in sql
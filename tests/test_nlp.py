@@ -1,7 +1,12 @@
 import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from nlp import parse
+import random
+import re
+import time
+
+import nlp
+from nlp import LEADING_ARTICLES, parse
 
 
 class TestIsArePattern:
@@ -82,3 +87,84 @@ class TestFailure:
 
     def test_whitespace(self):
         assert parse("   ") is None
+
+
+# The original cleaning and pattern loop, kept to pin the precompiled
+# cleaner, pattern gates and line-break variants to the same answers.
+REFERENCE_FILLERS = re.compile(
+    r"\b(um|uh|like|so|well|okay|oh|actually|basically|i think|you know)\b", re.IGNORECASE
+)
+REFERENCE_PATTERNS = [(pattern, groups) for pattern, groups, _ in nlp.PATTERNS]
+
+
+def _reference_clean(text: str) -> str:
+    text = text.strip()
+    text = re.sub(r"[.!?]+$", "", text)
+    text = REFERENCE_FILLERS.sub("", text)
+    return re.sub(r"\s{2,}", " ", text).strip()
+
+
+def _reference_parse(raw_input: str) -> tuple[str, str] | None:
+    cleaned = _reference_clean(raw_input)
+    if not cleaned:
+        return None
+    for pattern, (item_group, loc_group) in REFERENCE_PATTERNS:
+        m = pattern.match(cleaned)
+        if m:
+            item = LEADING_ARTICLES.sub("", m.group(item_group).strip()).strip()
+            location = LEADING_ARTICLES.sub("", m.group(loc_group).strip()).strip()
+            if item and location:
+                return item, location
+    return None
+
+
+WORDS = [
+    "the", "my", "drill", "keys", "i", "I'm", "we", "we're", "were", "am", "put",
+    "putting", "kept", "is", "are", "in", "IN", "next to", "inside", "has", "holds",
+    "um", "uh", "like", "So", "well", "okay", "oh", "actually", "basically", "i think",
+    "you know", "garage", "box", ",", ".", "!", "...",
+]
+GAPS = [" ", " ", " ", "  ", "\n", "\t", " \n ", "", " , "]
+
+
+def _utterances(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(["", " ", "\n"]) + "".join(
+            rng.choice(WORDS) + rng.choice(GAPS) for _ in range(rng.randint(0, 9))
+        )
+        for _ in range(count)
+    ]
+
+
+class TestMatchesReference:
+    def test_clean(self):
+        for text in _utterances(5000):
+            assert nlp.clean(text) == _reference_clean(text), repr(text)
+
+    def test_parse(self):
+        for text in _utterances(5000, seed=1):
+            assert parse(text) == _reference_parse(text), repr(text)
+
+    def test_line_breaks(self):
+        assert parse("the drill\nis in\nthe garage") == ("drill", "garage")
+        assert parse("put\nthe drill in the garage") == ("drill", "garage")
+        assert parse("drill\n\ngarage") is None
+
+
+class TestWorstCase:
+    # With a single line break the original patterns rescanned to it from
+    # every separator: ~100-250 ms at this length, growing quadratically.
+    INPUTS = [
+        "x in " * 2000 + "x\nz",
+        "x is in " * 1400 + "x\nz",
+        "put " + "x on " * 2000 + "x\nz",
+        "x , " * 2500 + "x\nz",
+        "x has " * 1700 + "x\nz",
+    ]
+
+    def test_long_inputs_are_linear(self):
+        for text in self.INPUTS:
+            start = time.perf_counter()
+            parse(text)
+            assert time.perf_counter() - start < 0.05, text[:20]
@@ -0,0 +1,75 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from phonetic import key, metaphone
+from search import THRESHOLD
+from search_index import HouseholdIndex
+
+
+@pytest.mark.parametrize("heard, meant", [
+    ("ranch", "wrench"),
+    ("nife", "knife"),
+    ("fone charger", "phone charger"),
+    ("lite bulbs", "light bulb"),
+    ("spunge", "sponge"),
+    ("h d m i cable", "HDMI cable"),
+    ("u.s.b. 3 hub", "USB 3 hub"),
+    ("the ranches", "wrench"),
+])
+def test_mistranscriptions_share_a_key(heard, meant):
+    assert key(heard) == key(meant)
+
+
+@pytest.mark.parametrize("a, b", [("drill", "grill"), ("hammer", "hamper"), ("tape", "tent")])
+def test_different_words_differ(a, b):
+    assert key(a) != key(b)
+
+
+def test_metaphone():
+    assert metaphone("wrench") == "RNX"
+    assert metaphone("thumb") == "0M"
+    assert metaphone("box") == "BKS"
+    assert metaphone("judge") == "JJ"
+    assert metaphone("123") == ""
+
+
+def test_key_ignores_word_order_and_repeats():
+    assert key("cable hdmi hdmi") == key("HDMI cable") == "KBL TM"
+    assert key("") == key("the") == ""
+
+
+def test_sound_alikes_rank_below_spelling_matches():
+    # "hood" shares a key with "hat"; "hatbox" only matches on spelling
+    index = HouseholdIndex([(1, "hood", "hall closet", "Clothing"), (2, "hatbox", "attic", "Other")])
+    assert [(entry.name, score) for entry, score in index.search("hat")] == [("hatbox", 66), ("hood", THRESHOLD)]
+    assert [entry.name for entry, _ in index.search("hat", limit=1)] == ["hatbox"]
+
+
+@pytest.mark.parametrize("query, collision, meant", [
+    ("kit", "coat", "kitbag"),
+    ("map", "mop", "maps"),
+    ("pen", "pin", "pens"),
+])
+def test_collisions_never_outrank_the_item_meant(query, collision, meant):
+    assert key(query) == key(collision)
+    index = HouseholdIndex([(1, collision, "shelf", "Other"), (2, meant, "desk", "Other")])
+    assert [entry.name for entry, _ in index.search(query)][0] == meant
+
+
+def test_one_misheard_word_finds_a_longer_name():
+    index = HouseholdIndex([(1, "socket wrench", "garage", "Tools"), (2, "hammer", "shed", "Tools")])
+    assert [(entry.name, score) for entry, score in index.search("ranch")] == [("socket wrench", THRESHOLD)]
+
+
+def test_spelled_out_acronym_finds_the_name_it_starts():
+    index = HouseholdIndex([(1, "HDMI cable", "tv stand", "Electronics"), (2, "hammer", "shed", "Tools")])
+    assert [entry.name for entry, _ in index.search("h d m i")] == ["HDMI cable"]
+
+
+def test_removed_items_stop_sounding_alike():
+    index = HouseholdIndex([(1, "socket wrench", "garage", "Tools")])
+    index.remove(1)
+    index.add(2, "hammer", "garage", "Tools")
+    assert index.search("ranch") == []
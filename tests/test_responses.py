@@ -0,0 +1,32 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datetime import datetime, timezone
+
+from responses import ITEM_FIELDS, JSONResponse, ModelResponse, item_dicts, search_result_dicts
+from schemas import ItemListResponse, ItemResponse, SearchResponse
+from search_index import IndexedItem
+
+ROWS = [
+    (1, "drill", "garage", "Tools", "Alice", datetime(2026, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)),
+    (2, "plates", "kitchen", "Kitchen", "Bob", datetime(2026, 1, 2, 3, 4, 5)),
+]
+
+
+def test_items_serialize_like_the_schema():
+    fast = JSONResponse({"count": 2, "items": item_dicts(ROWS), "next_cursor": None}).body
+    model = ItemListResponse(count=2, items=[ItemResponse(**dict(zip(ITEM_FIELDS, row))) for row in ROWS])
+    assert fast == model.model_dump_json().encode()
+
+
+def test_search_results_serialize_like_the_schema():
+    matches = [(IndexedItem(1, "drill", "garage", "Tools"), 100)]
+    fast = JSONResponse({"query": "drill", "message": "", "results": search_result_dicts(matches)}).body
+    assert fast == SearchResponse.model_validate_json(fast).model_dump_json().encode()
+
+
+def test_model_response_skips_validation():
+    model = ItemListResponse.model_construct(count=1, items=[], next_cursor=None)
+    response = ModelResponse(model)
+    assert response.body == b'{"count":1,"items":[],"next_cursor":null}'
+    assert response.headers["content-type"] == "application/json"
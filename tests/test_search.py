@@ -2,7 +2,7 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
 from unittest.mock import MagicMock
-from search import fuzzy_search
+from search import fuzzy_search, normalize
 
 
 def _make_item(name: str, location: str, category: str = "Other") -> MagicMock:
@@ -55,6 +55,25 @@ class TestFuzzySearch:
         results = fuzzy_search(items, "tools")
         assert len(results) == 1
 
+    def test_name_outranks_location_and_category(self):
+        items = [
+            _make_item("hammer", "Tools", "Other"),
+            _make_item("wrench", "shed", "Tools"),
+            _make_item("Tools", "garage", "Other"),
+        ]
+        results = fuzzy_search(items, "Tools")
+        assert [(item.name, score) for item, score in results] == [("Tools", 100), ("hammer", 90), ("wrench", 80)]
+
+    def test_threshold(self):
+        items = [_make_item("hammer", "shed", "Tools")]
+        assert fuzzy_search(items, "Tools", threshold=81) == []
+        assert len(fuzzy_search(items, "Tools", threshold=80)) == 1
+
+    def test_query_with_no_words(self):
+        items = [_make_item("A", "garage"), _make_item("drill", "?")]
+        assert fuzzy_search(items, "the") == []
+        assert fuzzy_search(items, "?", threshold=0) == []
+
     def test_empty_list(self):
         assert fuzzy_search([], "drill") == []
 
@@ -63,3 +82,108 @@ class TestFuzzySearch:
         results = fuzzy_search(items, "drill power")
         assert len(results) == 1
         assert results[0][1] >= 80
+
+
+def _reference_search(items, query, threshold=60):
+    """The original per-item loop, weighted and on normalized text, kept to pin the vectorized scorer's output."""
+    from rapidfuzz import fuzz
+
+    query = normalize(query)
+    results = []
+    for item in items:
+        best = int(max(
+            round(fuzz.token_set_ratio(query, normalize(item.name)) * 1.0, 6),
+            round(fuzz.token_set_ratio(query, normalize(item.location)) * 0.9, 6),
+            round(fuzz.token_set_ratio(query, normalize(item.category)) * 0.8, 6),
+        ))
+        if best >= threshold:
+            results.append((item, best))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results
+
+
+class TestBatchScoring:
+    ITEMS = [
+        _make_item(name, location, category)
+        for name, location, category in [
+            ("power drill", "garage", "Tools"),
+            ("drill bits", "garage shelf", "Tools"),
+            ("cordless drill", "basement", "Tools"),
+            ("drill", "shed", "Tools"),
+            ("dinner plates", "kitchen", "Kitchen"),
+            ("garden hose", "garage", "Outdoor"),
+            ("hose nozzle", "garden shed", "Outdoor"),
+            ("band-aids", "bathroom cabinet", "Medical"),
+            ("phone charger", "kitchen drawer", "Electronics"),
+            ("usb cable", "office drawer", "Electronics"),
+        ]
+    ]
+
+    def test_matches_reference_ordering(self):
+        for query in ["drill", "garage", "hose", "kitchen drawer", "tools", "garden", "bandaid", "xylophone"]:
+            assert fuzzy_search(self.ITEMS, query) == _reference_search(self.ITEMS, query)
+
+    def test_limit_keeps_reference_prefix(self):
+        for query in ["drill", "garage", "drawer"]:
+            expected = _reference_search(self.ITEMS, query)
+            for limit in range(len(expected) + 2):
+                assert fuzzy_search(self.ITEMS, query, limit=limit) == expected[:limit]
+
+    def test_limit_keeps_reference_prefix_at_any_threshold(self):
+        for query in ["drill", "garage", "drawer", "tools"]:
+            for threshold in (0, 50, 60, 75, 90):
+                expected = _reference_search(self.ITEMS, query, threshold)
+                for limit in (1, 2, 3, 5):
+                    assert fuzzy_search(self.ITEMS, query, limit, threshold) == expected[:limit]
+
+    def test_scores_are_ints(self):
+        results = fuzzy_search(self.ITEMS, "drill")
+        assert all(type(score) is int for _, score in results)
+
+
+def _reference_rank(query, columns, threshold, limit, weights):
+    """rank() as a plain loop over rows: token_set_ratio on every field, no cutoffs."""
+    from rapidfuzz import fuzz
+
+    if not query:
+        return []
+    results = []
+    for row, values in enumerate(zip(*columns)):
+        best = int(max(
+            round(fuzz.token_set_ratio(query, value) * weight, 6) for value, weight in zip(values, weights)
+        ))
+        if best >= threshold:
+            results.append((row, best))
+    results.sort(key=lambda r: r[1], reverse=True)
+    return results if limit is None else results[:limit]
+
+
+class TestRankMatchesReference:
+    """rank()'s score_cutoff pruning must never change what it returns."""
+
+    def _value(self, rng):
+        # Short words from a few letters: plenty of near misses and tied scores
+        words = ("".join(rng.choice("abdehlorst") for _ in range(rng.randint(1, 7))) for _ in range(rng.randint(1, 3)))
+        return normalize(" ".join(words))
+
+    def test_random_columns_thresholds_limits_and_weights(self):
+        import random
+
+        from search import rank
+
+        rng = random.Random(23)
+        for _ in range(500):
+            size = rng.randint(1, 40)
+            columns = [[self._value(rng) for _ in range(size)] for _ in range(3)]
+            query = self._value(rng)
+            weights = rng.choice([(1.0, 0.9, 0.8), (1.0, 1.0, 1.0), (0.7, 1.0, 0.55)])
+            threshold = rng.randint(0, 100)
+            limit = rng.choice([None, 1, 2, 3, 5, size])
+            assert rank(query, columns, threshold, limit, weights) == _reference_rank(
+                query, columns, threshold, limit, weights
+            ), (query, columns, threshold, limit, weights)
+
+    def test_every_threshold_on_a_location_hit(self):
+        items = [_make_item("x", "drill hammer", "zzz")]
+        for threshold in range(101):
+            assert fuzzy_search(items, "drawer", threshold=threshold) == _reference_search(items, "drawer", threshold)
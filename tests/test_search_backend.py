@@ -0,0 +1,176 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import create_engine, delete, event, insert, select, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import search_backend
+from migrations import upgrade
+from models import Household, Item, Member
+from search_backend import PostgresTrigramBackend, SearchBackend, SQLiteFTSBackend
+
+pytestmark = pytest.mark.skipif(not search_backend.SQLITE_FTS, reason="SQLite built without FTS5 trigram")
+
+ITEMS = [
+    (1, "power drill", "Garage shelf", "Tools"),
+    (1, "drill bits", "garage", "Tools"),
+    (1, "dinner plates", "kitchen cabinet", "Kitchen"),
+    (1, "hdmi cable", "TV stand", "Electronics"),
+    (2, "drill", "shed", "Tools"),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backend.db'}")
+    upgrade(engine)
+    with Session(engine) as session:
+        for h in (1, 2):
+            session.execute(insert(Household).values(id=h, name=f"home {h}", join_code=f"CODE{h:02d}"))
+            session.execute(insert(Member).values(id=h, household_id=h, name="m", token=f"t{h}"))
+        session.execute(insert(Item), [
+            {"household_id": h, "added_by": h, "name": n, "location": l, "category": c, "raw_input": n}
+            for h, n, l, c in ITEMS
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _names(db, condition):
+    return sorted(db.scalars(select(Item.name).where(Item.household_id == 1, condition)))
+
+
+@pytest.mark.parametrize("attribute,value", [
+    (Item.location, "garage"),
+    (Item.location, "GARAGE"),
+    (Item.location, "arag"),
+    (Item.location, "ga"),
+    (Item.category, "tool"),
+    (Item.category, "nothing"),
+])
+def test_fts_contains_matches_ilike(db, attribute, value):
+    fts, like = SQLiteFTSBackend(), SearchBackend()
+    assert _names(db, fts.contains(db, 1, attribute, value)) == _names(db, like.contains(db, 1, attribute, value))
+
+
+def test_fts_follows_updates_and_deletes(db):
+    fts = SQLiteFTSBackend()
+    db.execute(update(Item).where(Item.name == "power drill").values(location="attic"))
+    db.execute(delete(Item).where(Item.name == "drill bits"))
+    db.commit()
+    assert _names(db, fts.contains(db, 1, Item.location, "garage")) == []
+    assert _names(db, fts.contains(db, 1, Item.location, "attic")) == ["power drill"]
+
+
+def test_fts_skips_updates_to_other_columns(db):
+    sqlite = db.connection().connection.driver_connection
+    before = sqlite.total_changes
+    db.execute(update(Item).values(name_normalized="x"))
+    # total_changes counts rows a trigger writes too; the five updates are all there is
+    assert sqlite.total_changes - before == len(ITEMS)
+
+
+def test_fts_candidates_scoped_and_bounded(db):
+    fts = SQLiteFTSBackend()
+    rows = fts.candidates(db, 1, "drill", limit=10)
+    assert {r.name for r in rows} == {"power drill", "drill bits"}
+    assert len(fts.candidates(db, 1, "drill", limit=1)) == 1
+
+
+def test_fts_candidates_short_query_falls_back(db):
+    rows = SQLiteFTSBackend().candidates(db, 1, "tv", limit=10)
+    assert [r.name for r in rows] == ["hdmi cable"]
+
+
+def _add_households(db, count, items):
+    for h in range(3, 3 + count):
+        db.execute(insert(Household).values(id=h, name=f"home {h}", join_code=f"CODE{h:02d}"))
+        db.execute(insert(Member).values(id=h, household_id=h, name="m", token=f"t{h}"))
+        db.execute(insert(Item), [
+            {"household_id": h, "added_by": h, "name": n, "location": l, "category": c, "raw_input": n}
+            for n, l, c in items
+        ])
+    db.commit()
+
+
+def _fts_statements(db, run):
+    """What run() returns, and the statements it executed that read items_fts."""
+    statements = []
+    engine = db.get_bind()
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        result = run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return result, [statement for statement in statements if "items_fts" in statement]
+
+
+def _reads_fts(condition):
+    return "items_fts" in str(select(Item.id).where(condition))
+
+
+def test_fts_used_only_for_values_rare_across_households(db):
+    # Eight more households keep their things in the garage shed
+    _add_households(db, 8, [("rake", "garage shed", "Outdoor"), ("shovel", "garage shed", "Outdoor")])
+    db.execute(insert(Item), [
+        {"household_id": 1, "added_by": 1, "name": f"misc {n}", "location": "loft", "category": "Other", "raw_input": ""}
+        for n in range(8)
+    ])
+    fts = SQLiteFTSBackend()
+
+    # Only a probe bounded by household 1's size reads items_fts; the filter scans its rows
+    condition, probes = _fts_statements(db, lambda: fts.contains(db, 1, Item.location, "garage"))
+    assert len(probes) == 1 and "LIMIT" in probes[0]
+    assert not _reads_fts(condition)
+    assert _names(db, condition) == ["drill bits", "power drill"]
+
+    condition = fts.contains(db, 1, Item.location, "cabinet")
+    assert _reads_fts(condition)
+    assert _names(db, condition) == ["dinner plates"]
+
+    rows, probes = _fts_statements(db, lambda: fts.candidates(db, 1, "garage", 10))
+    assert {r.name for r in rows} == {"power drill", "drill bits"}
+    assert len(probes) == 1 and "LIMIT" in probes[0]
+    rows, probes = _fts_statements(db, lambda: fts.candidates(db, 1, "cabinet", 10))
+    assert rows[0].name == "dinner plates"
+    assert "rank" in probes[-1]
+
+
+def test_household_filter_scan_plan(db):
+    _add_households(db, 8, [("rake", "garage shed", "Outdoor")])
+    condition = SQLiteFTSBackend().contains(db, 1, Item.location, "garage")
+    statement = select(Item.id).where(Item.household_id == 1, condition).order_by(Item.created_at.desc())
+    sql = str(statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[3] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "ix_items_household_created" in plan
+    assert "items_fts" not in plan
+
+
+def test_postgres_candidates_use_trigram_operator():
+    backend = PostgresTrigramBackend()
+    captured = {}
+
+    class FakeSession:
+        def execute(self, statement):
+            captured["sql"] = str(statement.compile(dialect=postgresql.dialect()))
+            return self
+
+        def all(self):
+            return []
+
+    backend.candidates(FakeSession(), 1, "drill", limit=5)
+    assert "<%" in captured["sql"]
+    assert "word_similarity" in captured["sql"]
+
+
+def test_postgres_ddl_builds_gin_indexes():
+    ddl = " ".join(search_backend.POSTGRES_TRGM_DDL)
+    assert "pg_trgm" in ddl
+    assert all(f"gin ({name} gin_trgm_ops)" in ddl for name in ("name", "location", "category"))
@@ -0,0 +1,117 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import asyncio
+import fnmatch
+
+import pytest
+
+from search_cache import MemoryBackend, RedisBackend, SearchCache, normalize_query
+from search_index import IndexedItem
+
+RESULTS = [(IndexedItem(1, "drill", "garage", "Tools"), 100), (IndexedItem(2, "drill bits", "garage", "Tools"), 90)]
+
+
+class FakeRedis:
+    """The slice of redis.asyncio.Redis the cache uses, over a dict."""
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    async def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    async def scan_iter(self, match="*"):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    backend = MemoryBackend(maxsize=16) if request.param == "memory" else RedisBackend(FakeRedis())
+    return SearchCache(backend)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_round_trip(cache):
+    key = run(cache.key(1, "drill", threshold=60))
+    assert run(cache.get(key)) is None
+    run(cache.set(key, RESULTS))
+    assert run(cache.get(key)) == RESULTS
+    assert cache.stats()["hits"] == 1
+
+
+def test_empty_results_are_cached(cache):
+    key = run(cache.key(1, "nothing"))
+    run(cache.set(key, []))
+    assert run(cache.get(key)) == []
+
+
+def test_invalidate_moves_household_on(cache):
+    key = run(cache.key(1, "drill"))
+    run(cache.set(key, RESULTS))
+    run(cache.invalidate(1))
+    assert run(cache.key(1, "drill")) != key
+    assert run(cache.get(run(cache.key(1, "drill")))) is None
+    # Other households keep their entries
+    assert run(cache.key(2, "drill")) == run(cache.key(2, "drill"))
+
+
+def test_key_normalizes_like_scoring(cache):
+    assert run(cache.key(1, "  spare   batteries ")) == run(cache.key(1, "spare batteries"))
+    assert run(cache.key(1, "The Drill")) == run(cache.key(1, "drill"))
+    assert run(cache.key(1, "drill")) != run(cache.key(1, "drill bits"))
+
+
+def test_key_includes_options(cache):
+    assert run(cache.key(1, "drill", limit=5)) != run(cache.key(1, "drill", limit=10))
+    assert run(cache.key(1, "drill", limit=5, threshold=60)) == run(cache.key(1, "drill", threshold=60, limit=5))
+
+
+def test_clear(cache):
+    key = run(cache.key(1, "drill"))
+    run(cache.set(key, RESULTS))
+    run(cache.clear())
+    assert run(cache.get(key)) is None
+
+
+def test_result_from_before_clear_is_never_served(cache):
+    for _ in range(5):
+        run(cache.invalidate(1))
+    key = run(cache.key(1, "drill"))
+    run(cache.clear())
+    # A search that read its key before the clear files its result late
+    run(cache.set(key, RESULTS))
+    for _ in range(5):
+        run(cache.invalidate(1))
+        assert run(cache.key(1, "drill")) != key
+
+
+def test_memory_versions_are_bounded():
+    backend = MemoryBackend(maxsize=4)
+    cache = SearchCache(backend)
+    first = run(cache.key(1, "drill"))
+    for household_id in range(2, 100):
+        run(cache.invalidate(household_id))
+    assert len(backend._versions) == 4
+    assert run(cache.key(1, "drill")) != first
+
+
+def test_normalize_query():
+    assert normalize_query(" the\tBatteries,  spare ") == "battery spare"
@@ -0,0 +1,110 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import time
+
+from cache import LRUCache, Versions
+from search_index import HouseholdIndex
+
+
+class TestHouseholdIndex:
+    def test_rows_sorted_by_id(self):
+        index = HouseholdIndex([(3, "c", "garage", "Other"), (1, "a", "shed", "Tools")])
+        assert [e.id for e in index.entries()] == [1, 3]
+
+    def test_add_and_remove(self):
+        index = HouseholdIndex([(1, "drill", "garage", "Tools")])
+        index.add(5, "plates", "kitchen", "Kitchen")
+        index.add(2, "hammer", "garage", "Tools")
+        assert [e.name for e in index.entries()] == ["drill", "hammer", "plates"]
+
+        index.remove(2)
+        index.remove(99)
+        assert [e.id for e in index.entries()] == [1, 5]
+        assert len(index) == 2
+
+    def test_add_existing_id_replaces(self):
+        index = HouseholdIndex([(1, "drill", "garage", "Tools")])
+        index.add(1, "drill", "shed", "Tools")
+        assert index.entries()[0].location == "shed"
+
+    def test_search_uses_stored_normalized_fields(self):
+        index = HouseholdIndex([(1, "Drills", "garage", "Tools", "stored", "garage", "tool", "")])
+        assert [(e.name, score) for e, score in index.search("stored")] == [("Drills", 100)]
+        assert index.search("drills") == []
+
+    def test_search_normalizes_missing_fields(self):
+        index = HouseholdIndex([(1, "The Drills", "garage", "Tools", None, None, None)])
+        index.add(2, "spare Batteries", "Kitchen Drawer", "Electronics")
+        assert [e.id for e, _ in index.search("drill")] == [1]
+        assert [e.id for e, _ in index.search("battery")] == [2]
+        assert [e.id for e, _ in index.search("kitchen drawers")] == [2]
+
+    def test_search_finds_names_that_sound_alike(self):
+        index = HouseholdIndex([(1, "socket wrench", "garage", "Tools"), (2, "HDMI cable", "tv stand", "Electronics")])
+        index.add(3, "wrench", "shed", "Tools")
+        # "socket wrench" shares only the sound of one word, after the spelling match
+        assert [(e.id, score) for e, score in index.search("ranch")] == [(3, 72), (1, 60)]
+        assert index.search("h d m i cable")[0][0].name == "HDMI cable"
+        # A row only found by sound scores the threshold, and stricter ones leave it out
+        assert [(e.id, score) for e, score in index.search("ranch", threshold=50)] == [(3, 72), (1, 50)]
+        assert index.search("ranch", threshold=90) == []
+        assert len(index.search("wrench", limit=1)) == 1
+
+    def test_query_with_no_words(self):
+        index = HouseholdIndex([(2, "A", "garage", "Other")])
+        assert index.search("the") == []
+
+    def test_remove_forgets_words(self):
+        index = HouseholdIndex([(1, "drill", "garage", "Tools"), (2, "drill bits", "shed", "Tools")])
+        index.remove(1)
+        index.add(2, "hammer", "shed", "Tools")
+        assert index.search("drill") == []
+        assert all("drill" not in words for words in index._words)
+        assert "TRL" not in index._sounds
+
+    def test_snapshot_is_isolated(self):
+        index = HouseholdIndex([(1, "drill", "garage", "Tools")])
+        snapshot = index.entries()
+        index.remove(1)
+        assert len(snapshot) == 1
+
+
+class TestLRUCache:
+    def test_lru_eviction(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_idle_expiry(self):
+        cache = LRUCache(10, ttl=0.05, sliding=True)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        time.sleep(0.06)
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+
+class TestVersions:
+    def test_bump_moves_key_on(self):
+        versions = Versions(4)
+        before = versions.get("a")
+        assert versions.get("a") == before
+        assert versions.bump("a") != before
+        assert versions.get("a") != before
+
+    def test_evicted_and_cleared_keys_never_repeat_a_number(self):
+        versions = Versions(2)
+        seen = [versions.get("a"), versions.bump("a")]
+        versions.get("b")
+        versions.get("c")
+        assert len(versions) == 2
+        seen.append(versions.get("a"))
+        versions.clear()
+        seen.append(versions.get("a"))
+        assert len(set(seen)) == len(seen)
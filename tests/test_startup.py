@@ -0,0 +1,76 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import glob
+import shutil
+import subprocess
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _run(code: str, **env: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env={**os.environ, **env},
+        capture_output=True, text=True, timeout=60,
+    )
+
+
+def test_import_leaves_database_and_search_alone():
+    # Nothing listens on port 1, so any connection attempt would fail the import
+    result = _run(
+        "import sys, database, main\n"
+        "assert 'engine' not in vars(database)\n"
+        "assert 'numpy' not in sys.modules and 'rapidfuzz' not in sys.modules\n",
+        DATABASE_URL="postgresql://nobody@127.0.0.1:1/homebox",
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def _run_with_dotenv(tmp_path, code: str, dotenv: str) -> subprocess.CompletedProcess:
+    # A copy of the app with its own .env, whatever the checkout has
+    for path in glob.glob(os.path.join(ROOT, "*.py")):
+        shutil.copy(path, tmp_path)
+    (tmp_path / ".env").write_text(dotenv)
+    names = {line.split("=")[0] for line in dotenv.splitlines()}
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True, timeout=60,
+        env={key: value for key, value in os.environ.items() if key not in names},
+    )
+
+
+def test_dotenv_applies_to_timing(tmp_path):
+    result = _run_with_dotenv(
+        tmp_path,
+        "import main, timing\nprint(timing.ENABLED, timing.SERVER_TIMING_HEADER)",
+        "TIMING=0\nSERVER_TIMING=0\n",
+    )
+    assert result.stdout.split() == ["False", "False"], result.stderr
+
+
+def test_dotenv_applies_to_search(tmp_path):
+    # crud imports search before anything touches database
+    result = _run_with_dotenv(
+        tmp_path,
+        "import main, search\nprint(search.FOLD_PLURALS, search.WORKERS)",
+        "SEARCH_FOLD_PLURALS=0\nSEARCH_WORKERS=2\n",
+    )
+    assert result.stdout.split() == ["False", "2"], result.stderr
+
+
+# Starts and stops the app, then reports whether the schema exists
+LIFESPAN = (
+    "from fastapi.testclient import TestClient\n"
+    "from sqlalchemy import inspect\n"
+    "import database, main\n"
+    "with TestClient(main.create_app()) as client:\n"
+    "    assert client.get('/health').status_code == 200\n"
+    "print(inspect(database.engine).has_table('items'))\n"
+)
+
+
+@pytest.mark.parametrize("mode, migrated", [("startup", "True"), ("background", "True"), ("off", "False")])
+def test_lifespan_migrations(tmp_path, mode, migrated):
+    result = _run(LIFESPAN, DATABASE_URL=f"sqlite:///{tmp_path / 'homebox.db'}", MIGRATIONS=mode)
+    assert result.stdout.strip() == migrated, result.stderr
@@ -0,0 +1,46 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import timing
+from timing import Histogram, RequestTiming, span
+
+
+def test_span_outside_request_is_noop():
+    with span("db"):
+        pass
+    assert timing._current.get() is None
+
+
+def test_spans_add_up():
+    current = RequestTiming()
+    token = timing._current.set(current)
+    try:
+        with span("db"):
+            pass
+        with span("db"):
+            pass
+        with span("parse"):
+            pass
+    finally:
+        timing._current.reset(token)
+    assert set(current.phases) == {"db", "parse"}
+    assert all(seconds >= 0 for seconds in current.phases.values())
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h_seconds", "Test.", ("route",), buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 3.0):
+        histogram.observe(("/x",), seconds)
+    lines = histogram.render()
+    assert 'h_seconds_bucket{route="/x",le="0.01"} 2' in lines
+    assert 'h_seconds_bucket{route="/x",le="0.1"} 3' in lines
+    assert 'h_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'h_seconds_count{route="/x"} 4' in lines
+    assert 'h_seconds_sum{route="/x"} 3.065000' in lines
+
+
+def test_server_timing_lists_phases_and_total():
+    current = RequestTiming()
+    current.add("db", 0.0015)
+    header = timing._server_timing(current, current.start + 0.004).decode()
+    assert header == "db;dur=1.50, total;dur=4.00"
@@ -0,0 +1,211 @@
+"""Per-request phase timing, Server-Timing headers and Prometheus histograms.
+
+TimingMiddleware starts a clock for each HTTP request and makes it current
+for the request's context; span("name") blocks anywhere below it add their
+duration to that request. Spans with the same name add up. Outside a
+request span() does nothing.
+
+TimedRoute adds a "handler" span around each endpoint. Whatever happens
+between the endpoint returning and the response starting (response model
+validation and JSON encoding) is reported as "serialize".
+
+When the response starts, the totals so far go out in a Server-Timing
+header. Once the response is finished, the request's total and each phase
+are added to cumulative histograms per route, which /metrics exposes in
+the Prometheus text format. Prometheus derives rolling windows from these
+with rate() and histogram_quantile().
+"""
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import env  # noqa: F401 — loads .env before the settings below are read
+
+ENABLED = os.getenv("TIMING", "1").lower() in ("1", "true", "yes")
+# Server-Timing shows clients how long each phase took; turn it off to keep that private
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds; Siri gives up on a shortcut after roughly ten seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTiming:
+    __slots__ = ("start", "phases", "handler_end")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.handler_end: float | None = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def span(phase: str) -> Iterator[None]:
+    """Time the block as part of the current request's phase."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, time.perf_counter() - start)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram, one series per label set."""
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...], buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the sum
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(snapshot.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip((*map(_format_bound, self.buckets), "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_seconds = Histogram(
+    "homebox_request_duration_seconds", "Time from request start to response end.", ("method", "route", "status"),
+)
+phase_seconds = Histogram(
+    "homebox_phase_duration_seconds", "Time spent in each phase of a request.", ("method", "route", "phase"),
+)
+
+
+def render_metrics() -> str:
+    return "\n".join([*request_seconds.render(), *phase_seconds.render()]) + "\n"
+
+
+def _route_label(scope: Scope) -> str:
+    # The route template keeps label cardinality bounded (/items/{item_id}, not every id)
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(timing: RequestTiming, now: float) -> bytes:
+    phases = {**timing.phases, "total": now - timing.start}
+    return ", ".join(f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in phases.items()).encode()
+
+
+class TimingMiddleware:
+    """Pure ASGI, so streamed responses pass through untouched."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                if timing.handler_end is not None:
+                    timing.add("serialize", now - timing.handler_end)
+                    # Anything after this point is streaming, not serialization
+                    timing.handler_end = None
+                if SERVER_TIMING_HEADER:
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", _server_timing(timing, now))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - timing.start
+            method, route = scope["method"], _route_label(scope)
+            request_seconds.observe((method, route, str(status)), total)
+            for phase, seconds in timing.phases.items():
+                phase_seconds.observe((method, route, phase), seconds)
+
+
+def _handler_done() -> None:
+    timing = _current.get()
+    if timing is not None:
+        timing.handler_end = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that times its endpoint as the "handler" phase."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        endpoint = self.dependant.call
+        # The request handler was built around the original call and reads
+        # dependant.call each time, so swapping it keeps FastAPI's signature
+        # handling and sync/async dispatch intact
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed(**values):
+                try:
+                    with span("handler"):
+                        return await endpoint(**values)
+                finally:
+                    _handler_done()
+        else:
+            @functools.wraps(endpoint)
+            def timed(**values):
+                try:
+                    with span("handler"):
+                        return endpoint(**values)
+                finally:
+                    _handler_done()
+        self.dependant.call = timed